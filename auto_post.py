@@ -1,27 +1,43 @@
 # -*- coding: utf-8 -*-
 # auto_post.py (OpenAI / Gemini 自動切替版)
-import json
+import argparse
+import asyncio
+import atexit
 import logging
 import os
 import pathlib
+import queue
 import random
 import re
-import string
+import time
 from collections import Counter
-from datetime import datetime, timezone
-from logging.handlers import RotatingFileHandler
-from typing import Dict, Iterable, List, Optional, Tuple
-
-import tweepy
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone, tzinfo
+from itertools import accumulate
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
 from dotenv import load_dotenv
-# OpenAI クライアント
-from openai import OpenAI
 
 # .env を読み込む
 load_dotenv()
 
 # ポストバリエーション定義をインポート
 from modules.post_variations import TOPICS, POST_TYPES, HOOKS
+# 重複検出ユーティリティをインポート
+from modules.dedup import (
+    HAMMING_TH,
+    INDEX_VERSION,
+    JACCARD_TH,
+    DedupIndex,
+    char_ngrams,
+    make_entry,
+    normalize,
+    pack_entry,
+    unpack_entries,
+)
 
 # ====== パス設定 ======
 BASE_DIR = pathlib.Path(__file__).resolve().parent
@@ -33,9 +49,13 @@ LOG_DIR.mkdir(parents=True, exist_ok=True)
 MD_PATH = OUT_DIR / "tweets_preview.md"
 JSON_PATH = OUT_DIR / "tweets_payload.json"
 LOG_PATH = LOG_DIR / "auto_post.log"
-INDEX_PATH = OUT_DIR / "dedup_index.json"
+INDEX_PATH = OUT_DIR / "dedup_index.bin"
+LEGACY_INDEX_PATH = OUT_DIR / "dedup_index.json"
+INDEX_META_PATH = OUT_DIR / "dedup_index.meta.json"
 
 # ====== ログ設定 ======
+# ファイル書き込み（ローテーション含む）はリスナースレッドで行い、
+# 呼び出し側はキューに積むだけにしてイベントループを止めない
 logger = logging.getLogger("auto_post")
 logger.setLevel(logging.INFO)
 handler = RotatingFileHandler(
@@ -45,12 +65,26 @@ formatter = logging.Formatter(
     "%(asctime)s [%(levelname)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
 )
 handler.setFormatter(formatter)
-logger.addHandler(handler)
+log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+logger.addHandler(QueueHandler(log_queue))
+log_listener = QueueListener(log_queue, handler)
+log_listener.start()
+# 終了時にキューに残ったレコードを書き出す
+atexit.register(log_listener.stop)
+
+# MDファイルからのインデックス構築を複数プロセスで行う最小件数
+PARALLEL_BUILD_MIN = 1000
 
 # ====== 生成バックエンド選択フラグ ======
 # 0 = OpenAI, 1 = Gemini, -1 = 自動（環境変数の有無で選択）
 PROVIDER_FLAG = int(os.getenv("PROVIDER_FLAG", "-1"))
 
+# 1回の試行で同時に投げる生成リクエスト数（1 なら従来どおり逐次）
+GENERATION_CONCURRENCY = max(1, int(os.getenv("GENERATION_CONCURRENCY", "2")))
+
+# 1回の投稿で行う生成の最大試行回数（失敗した生成も1回と数える）
+MAX_ATTEMPTS = 5
+
 # ====== 共通ユーティリティ ======
 def sanitize_and_limit(text: str, limit: int = 140) -> str:
     """テキストを1行にまとめ、指定文字数以内に制限する"""
@@ -62,154 +96,222 @@ def sanitize_and_limit(text: str, limit: int = 140) -> str:
         one_line = one_line[:limit]
     return one_line
 
+_LOCAL_TZ_TTL = 3600.0  # 夏時間の切り替えに追従できるよう、ローカルTZは1時間ごとに解決し直す
+_local_tz: Optional[tzinfo] = None
+_local_tz_resolved_at = 0.0
+
+def _local_timezone() -> tzinfo:
+    """ローカルタイムゾーンを返す（astimezone() による解決結果を一定時間使い回す）"""
+    global _local_tz, _local_tz_resolved_at
+    now = time.monotonic()
+    if _local_tz is None or now - _local_tz_resolved_at > _LOCAL_TZ_TTL:
+        _local_tz = datetime.now(timezone.utc).astimezone().tzinfo
+        _local_tz_resolved_at = now
+    return _local_tz
+
+_md_fd: Optional[int] = None
+
+def _close_md_fd() -> None:
+    """MDファイルの追記用ファイル記述子を閉じる"""
+    global _md_fd
+    if _md_fd is not None:
+        os.close(_md_fd)
+        _md_fd = None
+
+# 開き直した場合も、終了時にはその時点の記述子を閉じる
+atexit.register(_close_md_fd)
+
+def _md_fd_for_append() -> int:
+    """
+    MDファイルの追記用ファイル記述子を返す（O_APPEND で開いたものを使い回す）
+
+    常駐モード中にMDファイルがローテーション・削除された場合は、消えたファイルに書き続けないよう
+    パスの指すファイル（inode）が変わっていれば開き直す。
+    """
+    global _md_fd
+    if _md_fd is not None:
+        try:
+            st = os.stat(MD_PATH)
+        except FileNotFoundError:
+            st = None
+        fst = os.fstat(_md_fd)
+        if st is None or (st.st_ino, st.st_dev) != (fst.st_ino, fst.st_dev):
+            _close_md_fd()
+    if _md_fd is None:
+        _md_fd = os.open(MD_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    return _md_fd
+
+_MD_TEMPLATE = "\n\n# Tweet Preview ({ts})\n\n{text}\n\n{hashtags}{citations}{posted}"
+
 def append_markdown_preview(
     text: str,
     hashtags: Optional[str],
     citations: Optional[List[str]],
     posted_url: Optional[str],
 ) -> None:
-    """投稿内容をMarkdownファイルに追記する"""
-    ts = datetime.now(timezone.utc).astimezone().isoformat(timespec="seconds")
-    with MD_PATH.open("a", encoding="utf-8") as f:
-        f.write(f"\n\n# Tweet Preview ({ts})\n\n")
-        f.write(text.replace("\n", " ") + "\n\n")
-        if hashtags:
-            f.write(hashtags + "\n\n")
-        if citations:
-            for u in citations:
-                f.write(f"- {u}\n")
-            f.write("\n")
-        if posted_url:
-            f.write(f"Posted: {posted_url}\n")
+    """投稿内容をMarkdownファイルに追記する（ブロック全体を1回のシステムコールで書き込む）"""
+    ts = datetime.now(_local_timezone()).isoformat(timespec="seconds")
+    block = _MD_TEMPLATE.format(
+        ts=ts,
+        text=text.replace("\n", " "),
+        hashtags=f"{hashtags}\n\n" if hashtags else "",
+        citations="".join(f"- {u}\n" for u in citations) + "\n" if citations else "",
+        posted=f"Posted: {posted_url}\n" if posted_url else "",
+    )
+    # O_APPEND への1回の write でブロック全体を追記する（複数プロセスからの追記でも行が混ざらない）
+    os.write(_md_fd_for_append(), block.encode("utf-8"))
 
 def save_payload_json(payload: Dict) -> None:
-    """投稿データをJSONファイルに保存する"""
-    with JSON_PATH.open("w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
-
-# === 重複検出ユーティリティ ===
-_PUNCT_TABLE = str.maketrans(
-    {c: " " for c in (string.punctuation + "’“”‘「」『』（）()[]{}")}
-)
-
-def normalize(text: str) -> str:
-    """テキストを正規化（小文字化、句読点削除、空白正規化）"""
-    if not text:
-        return ""
-    t = text.strip().lower()
-    t = re.sub(r"\s+", " ", t.translate(_PUNCT_TABLE))
-    return t
-
-def char_ngrams(s: str, n: int = 2) -> set:
-    """文字列からn-gramセットを生成"""
-    s = s.replace(" ", "")
-    if len(s) < n:
-        return {s} if s else set()
-    return {s[i : i + n] for i in range(len(s) - n + 1)}
-
-def jaccard(a: set, b: set) -> float:
-    """2つの集合のJaccard係数を計算"""
-    if not a or not b:
-        return 0.0
-    inter = len(a & b)
-    if inter == 0:
-        return 0.0
-    return inter / len(a | b)
-
-
-def simhash(tokens: Iterable[str]) -> int:
-    """トークンリストからSimHashを計算"""
-    v = [0] * 64
-    for tok, cnt in Counter(tokens).items():
-        h = hash(tok) & ((1 << 64) - 1)
-        w = cnt
-        for i in range(64):
-            if (h >> i) & 1:
-                v[i] += w
-            else:
-                v[i] -= w
-    out = 0
-    for i, val in enumerate(v):
-        if val >= 0:
-            out |= 1 << i
-    return out
-
-
-def hamming(a: int, b: int) -> int:
-    """2つの整数のハミング距離を計算"""
-    return (a ^ b).bit_count()
-
-def load_existing_index() -> List[Dict]:
-    """既存の重複検出インデックスをロードする"""
-    if INDEX_PATH.exists():
+    """投稿データをJSONファイルに保存する（一時ファイル経由で置き換える）"""
+    tmp_path = JSON_PATH.with_suffix(".json.tmp")
+    tmp_path.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    os.replace(tmp_path, JSON_PATH)
+
+# === 重複検出インデックス ===
+def load_existing_index() -> DedupIndex:
+    """既存の重複検出インデックスをロードする（LSHは保存済みMinHashから再構築）"""
+    path = INDEX_PATH if INDEX_PATH.exists() else LEGACY_INDEX_PATH
+    if path.exists():
         try:
-            return json.loads(INDEX_PATH.read_text(encoding="utf-8"))
+            if path == LEGACY_INDEX_PATH:
+                # 旧形式(JSON)はバイナリ形式に移行する
+                index = DedupIndex(orjson.loads(path.read_bytes()))
+                persist_index(index)
+                logger.info("%s を %s に移行しました", path.name, INDEX_PATH.name)
+                return index
+            return DedupIndex(unpack_entries(path.read_bytes()))
         except Exception:
             logger.warning(
-                "%s の読み込みに失敗。MDファイルからインデックスを再構築します", INDEX_PATH.name
+                "%s の読み込みに失敗。MDファイルからインデックスを再構築します", path.name
             )
-    return []
+    return DedupIndex()
+
+def extract_past_texts_from_md(
+    max_items: Optional[int] = None, offset: int = 0
+) -> Tuple[List[str], int]:
+    """
+    Markdownファイルから過去の投稿テキストを抽出する
+
+    ファイル全体を読み込まず、offset の位置から1行ずつ読み進める。
+
+    Args:
+        max_items: 抽出する最大件数
+        offset: 読み始める位置（バイト）。ファイルより大きければ先頭から読む
 
-def extract_past_texts_from_md(max_items: Optional[int] = None) -> List[str]:
-    """Markdownファイルから過去の投稿テキストを抽出する"""
+    Returns:
+        (投稿テキストのリスト, 読み終えた位置のバイトオフセット)
+    """
     if not MD_PATH.exists():
-        return []
-    lines = MD_PATH.read_text(encoding="utf-8", errors="ignore").splitlines()
+        return [], 0
     texts: List[str] = []
-    i = 0
-    while i < len(lines):
-        if lines[i].startswith("# Tweet Preview"):
-            j = i + 1
-            while j < len(lines) and not lines[j].strip():
-                j += 1
-            if j < len(lines):
-                texts.append(lines[j].strip())
+    with MD_PATH.open("rb") as f:
+        if offset > MD_PATH.stat().st_size:
+            offset = 0
+        f.seek(offset)
+        pending = False  # 見出しの直後で本文を待っている状態
+        for raw in f:
+            # 見出しの判定はバイト列のまま行い、本文の行だけをデコードする
+            if pending:
+                stripped = raw.decode("utf-8", errors="ignore").strip()
+                if not stripped:
+                    continue
+                texts.append(stripped)
+                pending = False
                 if max_items and len(texts) >= max_items:
                     break
-            i = j
-        else:
-            i += 1
-    return texts
-
-def build_index_from_md() -> List[Dict]:
-    """Markdownファイルから重複検出インデックスを構築する"""
-    texts = extract_past_texts_from_md()
-    index: List[Dict] = []
-    for t in texts:
-        norm = normalize(t)
-        grams = char_ngrams(norm, 2)
-        index.append({"norm": norm, "simhash": simhash(grams)})
-    return index
+            if raw.startswith(b"# Tweet Preview"):
+                pending = True
+        return texts, f.tell()
 
-def persist_index(index: List[Dict]) -> None:
-    """インデックスをファイルに永続化する"""
-    INDEX_PATH.write_text(
-        json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8"
-    )
+def build_index_from_md() -> Tuple[DedupIndex, int]:
+    """
+    Markdownファイルから重複検出インデックスを構築する
+
+    Returns:
+        (インデックス, 読み終えたMDファイルのバイトオフセット)
+    """
+    texts, offset = extract_past_texts_from_md()
+    norms = [normalize(t) for t in texts]
+    if len(norms) < PARALLEL_BUILD_MIN:
+        index = DedupIndex()
+        for n in norms:
+            index.add(n)
+        return index, offset
+    # 件数が多い場合はSimHash/MinHashの計算を複数プロセスに分散する
+    workers = max(1, (os.cpu_count() or 1) - 1)
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        items = list(ex.map(make_entry, norms, chunksize=64))
+    return DedupIndex(items), offset
+
+def load_index_meta() -> Dict:
+    """インデックスのメタ情報（MDファイルの同期済み位置など）をロードする"""
+    if INDEX_META_PATH.exists():
+        try:
+            return orjson.loads(INDEX_META_PATH.read_bytes())
+        except Exception:
+            logger.warning("%s の読み込みに失敗しました", INDEX_META_PATH.name)
+    return {}
+
+def save_index_meta(meta: Dict) -> None:
+    """インデックスのメタ情報を保存する"""
+    INDEX_META_PATH.write_bytes(orjson.dumps(meta))
+
+def sync_index_meta(offset: int) -> None:
+    """
+    MDファイルの同期済み位置と、その時点の更新時刻・サイズを保存する
+
+    Args:
+        offset: インデックスに反映済みのMDファイルのバイトオフセット
+    """
+    meta = {"version": INDEX_VERSION, "md_offset": offset}
+    if MD_PATH.exists():
+        st = MD_PATH.stat()
+        meta["md_mtime_ns"] = st.st_mtime_ns
+        meta["md_size"] = st.st_size
+    save_index_meta(meta)
+
+def md_unchanged(meta: Dict) -> bool:
+    """前回の同期以降にMDファイルが変更されていなければ True"""
+    if not MD_PATH.exists() or "md_size" not in meta:
+        return False
+    st = MD_PATH.stat()
+    return st.st_size == meta["md_size"] and st.st_mtime_ns == meta.get("md_mtime_ns")
+
+def persist_index(index: DedupIndex) -> None:
+    """インデックス全体をファイルに書き出す（再構築時のみ）"""
+    INDEX_PATH.write_bytes(b"".join(pack_entry(item) for item in index))
+
+def append_index(items: List[Dict]) -> None:
+    """追加したエントリだけをインデックスファイルの末尾に追記する"""
+    with INDEX_PATH.open("ab") as f:
+        f.write(b"".join(pack_entry(item) for item in items))
 
 def most_similar_info(
-    candidate: str, index: List[Dict]
+    candidate: str, index: DedupIndex
 ) -> Tuple[float, int, Optional[Dict]]:
     """候補テキストと最も類似する過去の投稿を見つける"""
-    norm = normalize(candidate)
-    grams = char_ngrams(norm, 2)
-    sh = simhash(grams)
-    best = (0.0, 64, None)
-    for item in index:
-        jac = jaccard(grams, char_ngrams(item["norm"], 2))
-        ham = hamming(sh, int(item["simhash"]))
-        if jac > best[0] or (jac == best[0] and ham < best[1]):
-            best = (jac, ham, item)
-    return best
+    return index.most_similar(candidate)
 
 def extract_block_terms(similar_norms: List[str], top_k: int = 8) -> List[str]:
     """類似テキストから回避すべきフレーズを抽出する"""
-    cnt = Counter()
+    cnt: Counter = Counter()
     for n in similar_norms:
-        for g in char_ngrams(n, 2):
-            cnt[g] += 1
+        cnt.update(char_ngrams(n, 2))
     return [w for w, _ in cnt.most_common(top_k)]
 
+# 表現のバリエーションを増やすための置換候補（新規性が得られなかった場合に使用）
+_VARIATION_PATTERNS = [
+    (re.compile(old), new)
+    for old, new in [
+        (r"実は", "意外にも"),
+        (r"知ってました", "ご存知でした"),
+        (r"信じられない", "驚くべき"),
+        (r"調査によると", "研究結果によると"),
+        (r"データが示す", "統計から見えるのは"),
+        (r"○○%", "約○割"),
+    ]
+]
+
 def add_blocklist_to_prompt(prompt: str, block_terms: List[str]) -> str:
     """プロンプトに回避すべきフレーズを追加する"""
     if not block_terms:
@@ -221,20 +323,26 @@ def add_blocklist_to_prompt(prompt: str, block_terms: List[str]) -> str:
         + "\n"
     )
 
+# 重み付きランダム選択の候補と累積重み（定義は実行中に変わらないため一度だけ作る）
+_TOPIC_KEYS = list(TOPICS)
+_TOPIC_CUM_WEIGHTS = list(accumulate(TOPICS[k]["weight"] for k in _TOPIC_KEYS))
+_POST_TYPE_KEYS = list(POST_TYPES)
+_POST_TYPE_CUM_WEIGHTS = list(
+    accumulate(POST_TYPES[k]["weight"] for k in _POST_TYPE_KEYS)
+)
+
 def generate_dynamic_prompt() -> str:
     """
     トピック、ポストタイプ、フックをランダムに選択して
     多様なプロンプトを生成する
     """
     # 重み付きランダム選択
-    topic_keys = list(TOPICS.keys())
-    topic_weights = [TOPICS[k]["weight"] for k in topic_keys]
-    topic_key = random.choices(topic_keys, weights=topic_weights, k=1)[0]
+    topic_key = random.choices(_TOPIC_KEYS, cum_weights=_TOPIC_CUM_WEIGHTS, k=1)[0]
     topic = TOPICS[topic_key]
 
-    post_type_keys = list(POST_TYPES.keys())
-    post_type_weights = [POST_TYPES[k]["weight"] for k in post_type_keys]
-    post_type_key = random.choices(post_type_keys, weights=post_type_weights, k=1)[0]
+    post_type_key = random.choices(
+        _POST_TYPE_KEYS, cum_weights=_POST_TYPE_CUM_WEIGHTS, k=1
+    )[0]
     post_type = POST_TYPES[post_type_key]
 
     hook = random.choice(HOOKS)
@@ -265,15 +373,25 @@ def generate_dynamic_prompt() -> str:
     return "\n".join(prompt_parts)
 
 # ====== 生成バックエンド実装 ======
-def generate_with_openai(base_prompt: str, model: str, api_key: str) -> str:
+# 生成クライアントのキャッシュ（リトライや常駐モードの投稿をまたいで接続を再利用する）
+_OPENAI_CLIENTS: Dict[str, Any] = {}
+_GEMINI_MODELS: Dict[Tuple[str, str, str], Any] = {}
+
+async def generate_with_openai(base_prompt: str, model: str, api_key: str) -> str:
     """OpenAI APIを使用してテキストを生成する"""
-    client = OpenAI(api_key=api_key)
+    client = _OPENAI_CLIENTS.get(api_key)
+    if client is None:
+        # 使う時だけ import（Gemini 経路や認証エラー時に読み込みコストを払わないため）
+        from openai import AsyncOpenAI
+
+        client = _OPENAI_CLIENTS[api_key] = AsyncOpenAI(api_key=api_key)
+
     system_prompt = (
         "あなたはX（旧Twitter）の魅力的な投稿を生成する専門家です。\n"
         "読者の興味を引き、価値ある情報を簡潔に伝える投稿を作成してください。\n"
         "出力は純テキストのみで、余計な説明は不要です。"
     )
-    resp = client.chat.completions.create(
+    resp = await client.chat.completions.create(
         model=model,
         messages=[
             {"role": "system", "content": system_prompt},
@@ -284,21 +402,30 @@ def generate_with_openai(base_prompt: str, model: str, api_key: str) -> str:
     )
     return (resp.choices[0].message.content or "").strip()
 
-def generate_with_gemini(
+async def generate_with_gemini(
     base_prompt: str, project_id: str, model_name: str, location: str = "us-central1"
 ) -> str:
     """Google Gemini APIを使用してテキストを生成する"""
-    # 使う時だけ import（環境に vertexai が無い場合でも他経路は動かすため）
-    try:
-        import vertexai
-        from vertexai.preview.generative_models import GenerativeModel
-    except Exception as e:
-        raise RuntimeError(f"Gemini ライブラリの読み込みに失敗しました: {e}")
-    vertexai.init(project=project_id, location=location)
-    model = GenerativeModel(model_name)
-    resp = model.generate_content(base_prompt)
+    key = (project_id, location, model_name)
+    model = _GEMINI_MODELS.get(key)
+    if model is None:
+        # 使う時だけ import（環境に vertexai が無い場合でも他経路は動かすため）
+        try:
+            import vertexai
+            from vertexai.preview.generative_models import GenerativeModel
+        except Exception as e:
+            raise RuntimeError(f"Gemini ライブラリの読み込みに失敗しました: {e}")
+        vertexai.init(project=project_id, location=location)
+        model = _GEMINI_MODELS[key] = GenerativeModel(model_name)
+    resp = await model.generate_content_async(base_prompt)
     return (getattr(resp, "text", "") or "").strip()
 
+async def generate_text(provider: str, info: Dict[str, str], prompt: str) -> str:
+    """選択されたプロバイダーでテキストを生成する"""
+    if provider == "openai":
+        return await generate_with_openai(prompt, info["model"], info["OPENAI_API_KEY"])
+    return await generate_with_gemini(prompt, info["GOOGLE_CLOUD_PROJECT"], info["model"])
+
 def choose_provider() -> Tuple[str, Dict[str, str]]:
     """
     使用するAIプロバイダーを選択する
@@ -352,6 +479,90 @@ def choose_provider() -> Tuple[str, Dict[str, str]]:
     )
 
 
+def prepare_index() -> DedupIndex:
+    """
+    重複検出インデックスをロードし、MDファイルの内容と同期する
+
+    前回同期した位置をメタ情報に保存し、MDファイルは追記された部分だけを読む。
+    """
+    index = load_existing_index()
+    meta = load_index_meta()
+    if not index:
+        index, offset = build_index_from_md()
+        persist_index(index)
+        logger.info("重複検出インデックスを初期化しました (%d件)", len(index))
+    else:
+        if meta.get("version") != INDEX_VERSION:
+            # 旧バージョンのSimHashはプロセスごとに値が変わるため計算し直す
+            index.refresh_simhashes()
+            persist_index(index)
+            logger.info("重複検出インデックスのSimHashを再計算しました (%d件)", len(index))
+        if md_unchanged(meta):
+            # 前回の同期以降MDファイルに変更が無ければ読み込み自体を省略する
+            offset = meta.get("md_offset", 0)
+        else:
+            texts, offset = extract_past_texts_from_md(offset=meta.get("md_offset", 0))
+            md_texts = {normalize(t) for t in texts}
+            known = {i["norm"] for i in index}
+            new_norms = list(md_texts - known)
+            if new_norms:
+                append_index([index.add(n) for n in new_norms])
+                logger.info("重複検出インデックスを更新しました (+%d件)", len(new_norms))
+    sync_index_meta(offset)
+    return index
+
+
+@dataclass
+class PostState:
+    """常駐モードで投稿をまたいで保持する状態"""
+    index: Optional[DedupIndex] = None
+    writer: Optional["OutputWriter"] = None
+
+
+class OutputWriter:
+    """
+    投稿結果のファイル書き出し（MD・JSON・インデックス）をバックグラウンドで行う
+
+    書き出し処理はキューに積んだ順に1つずつ別スレッドで実行する。順序が保たれるので、
+    MDへの追記の後に積んだインデックスのメタ情報更新は追記後のファイルサイズを参照できる。
+    """
+
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            func, args = await self.queue.get()
+            try:
+                await asyncio.to_thread(func, *args)
+            except Exception as e:
+                logger.exception("ファイルの書き出しに失敗しました: %s", e)
+            finally:
+                self.queue.task_done()
+
+    def put(self, func, *args) -> None:
+        """書き出し処理をキューに積む（すぐに戻る）"""
+        self.queue.put_nowait((func, args))
+
+    async def close(self) -> None:
+        """積まれた書き出しをすべて終えてから停止する"""
+        await self.queue.join()
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+def persist_posted_entry(item: Dict) -> None:
+    """投稿済みエントリをインデックスファイルに追記し、メタ情報をMDの現在位置に合わせる"""
+    try:
+        append_index([item])
+        # 今回MDに追記した投稿はインデックスに反映済みなので、次回の読み込みを省略できる
+        sync_index_meta(MD_PATH.stat().st_size)
+        logger.info("重複検出インデックスを更新しました (+1)")
+    except Exception as e:
+        logger.warning("重複検出インデックスの更新に失敗: %s", e)
+
+
 def main() -> int:
     """
     メイン処理：AI投稿を生成してXに投稿する
@@ -359,6 +570,125 @@ def main() -> int:
     Returns:
         int: 終了コード（0=成功、2=認証エラー、3=生成エラー、4=投稿エラー）
     """
+    return asyncio.run(post_once())
+
+
+async def run_resident(interval: int) -> int:
+    """
+    常駐モード：重複検出インデックスをメモリに保持したまま定期的に投稿する
+
+    Args:
+        interval: 投稿間隔（秒）
+
+    Returns:
+        int: 終了コード（認証エラー時のみ 2 で終了）
+    """
+    state = PostState()
+    logger.info("常駐モードで起動しました (間隔: %d秒)", interval)
+    try:
+        while True:
+            code = await post_once(state)
+            if code == 2:
+                return code
+            logger.info("次の投稿まで%d秒待機します (前回の終了コード: %d)", interval, code)
+            await asyncio.sleep(interval)
+    finally:
+        if state.writer is not None:
+            await state.writer.close()
+
+
+async def post_once(state: Optional[PostState] = None) -> int:
+    """
+    1回分の生成・投稿を行う。生成・投稿のネットワーク待ちの間にファイルI/Oを進める
+
+    Args:
+        state: 常駐モードの状態。インデックスを保持していればロードを省略する。
+            書き出し用のOutputWriterも投稿をまたいで使い回す
+
+    Returns:
+        int: 終了コード（0=成功、2=認証エラー、3=生成エラー、4=投稿エラー）
+    """
+    writer = state.writer if state else None
+    if writer is None:
+        writer = OutputWriter()
+        if state:
+            state.writer = writer
+    try:
+        return await _generate_and_post(state, writer)
+    finally:
+        if not state:
+            await writer.close()
+
+
+async def _generate_candidates(
+    provider: str,
+    info: Dict[str, str],
+    base_prompt: str,
+    index_task: "asyncio.Task[DedupIndex]",
+) -> Tuple[str, str]:
+    """
+    同じプロンプトで複数の生成を同時に投げ、最初に新規性の判定を通ったものを採用する
+
+    個々の生成の失敗（レート制限・タイムアウトなど）は試行1回として数えて残りの結果を待つ。
+
+    Returns:
+        (新規性の判定を通ったテキスト（無ければ空文字）, 最後に生成できたテキスト（1件も無ければ空文字）)
+    """
+    block_terms: List[str] = []
+    chosen_text = ""
+    last_text = ""
+    attempt = 0
+
+    while attempt < MAX_ATTEMPTS and not chosen_text:
+        prompt = (
+            add_blocklist_to_prompt(base_prompt, block_terms)
+            if block_terms
+            else base_prompt
+        )
+        n = min(GENERATION_CONCURRENCY, MAX_ATTEMPTS - attempt)
+        tasks = [
+            asyncio.create_task(generate_text(provider, info, prompt))
+            for _ in range(n)
+        ]
+        sims = []
+        try:
+            for fut in asyncio.as_completed(tasks):
+                attempt += 1
+                try:
+                    raw = await fut
+                except Exception as e:
+                    logger.warning(
+                        "生成試行 %d/%d [%s] が失敗しました: %s", attempt, MAX_ATTEMPTS, provider, e
+                    )
+                    continue
+                last_text = sanitize_and_limit(raw, 140)
+                index = await index_task
+
+                jac, ham, nearest = most_similar_info(last_text, index)
+                logger.info(
+                    "生成試行 %d/%d [%s]: 類似度=%.3f, ハミング距離=%d",
+                    attempt, MAX_ATTEMPTS, provider, jac, ham
+                )
+
+                if jac < JACCARD_TH and ham > HAMMING_TH:
+                    logger.info("✓ 新規性の高い投稿を生成しました")
+                    chosen_text = last_text
+                    break
+
+                if nearest:
+                    sims.append(nearest["norm"])
+        finally:
+            # 採用が決まった（または失敗した）時点で残りの生成は取り消す
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        block_terms = extract_block_terms(sims, top_k=8)
+
+    return chosen_text, last_text
+
+
+async def _generate_and_post(state: Optional[PostState], writer: OutputWriter) -> int:
+    """post_once の本体。ファイルの書き出しはすべて writer に積む"""
     # === X(Twitter) 認証情報 ===
     x_api_key = os.getenv("X_API_KEY")
     x_api_secret = os.getenv("X_API_SECRET")
@@ -379,22 +709,11 @@ def main() -> int:
         logger.error("X API認証情報が不足しています: %s", ", ".join(missing_x))
         return 2
 
-    # === 重複検出インデックスの準備 ===
-    index = load_existing_index()
-    if not index:
-        index = build_index_from_md()
-        persist_index(index)
-        logger.info("重複検出インデックスを初期化しました (%d件)", len(index))
+    # === 重複検出インデックスの準備（初回の生成リクエストと並行して実行） ===
+    if state and state.index is not None:
+        index_task = asyncio.create_task(asyncio.sleep(0, result=state.index))
     else:
-        md_texts = {normalize(t) for t in extract_past_texts_from_md()}
-        known = {i["norm"] for i in index}
-        new_norms = list(md_texts - known)
-        if new_norms:
-            for n in new_norms:
-                grams = char_ngrams(n, 2)
-                index.append({"norm": n, "simhash": simhash(grams)})
-            persist_index(index)
-            logger.info("重複検出インデックスを更新しました (+%d件)", len(new_norms))
+        index_task = asyncio.create_task(asyncio.to_thread(prepare_index))
 
     # === 生成 ===
     try:
@@ -403,66 +722,27 @@ def main() -> int:
         base_prompt = generate_dynamic_prompt()
         logger.info("Generated dynamic prompt for variety")
 
-        MAX_ATTEMPTS = 5
-        JACCARD_TH = 0.80
-        HAMMING_TH = 3
-        block_terms: List[str] = []
-        chosen_text = ""
-        last_text = ""
-
-        for attempt in range(1, MAX_ATTEMPTS + 1):
-            prompt = (
-                add_blocklist_to_prompt(base_prompt, block_terms)
-                if block_terms
-                else base_prompt
-            )
-
-            if provider == "openai":
-                raw = generate_with_openai(
-                    prompt, info["model"], info["OPENAI_API_KEY"]
-                )
-            else:
-                raw = generate_with_gemini(
-                    prompt, info["GOOGLE_CLOUD_PROJECT"], info["model"]
-                )
-
-            last_text = sanitize_and_limit(raw, 140)
-
-            jac, ham, nearest = most_similar_info(last_text, index)
-            logger.info(
-                "生成試行 %d/%d [%s]: 類似度=%.3f, ハミング距離=%d",
-                attempt, MAX_ATTEMPTS, provider, jac, ham
-            )
-
-            if jac < JACCARD_TH and ham > HAMMING_TH:
-                logger.info("✓ 新規性の高い投稿を生成しました")
-                chosen_text = last_text
-                break
-
-            sims = []
-            if nearest:
-                sims.append(nearest["norm"])
-            block_terms = extract_block_terms(sims, top_k=8)
+        chosen_text, last_text = await _generate_candidates(
+            provider, info, base_prompt, index_task
+        )
+        index = await index_task
+        if state:
+            state.index = index
+        if not last_text:
+            logger.error("すべての生成試行が失敗しました")
+            return 3
 
         if not chosen_text:
             logger.warning("新規性の高い候補が見つからず、軽微な変更を適用します。")
             # 最後に生成されたテキストを使用し、軽微な調整を加える
             text = last_text or ""
 
-            # 表現のバリエーションを増やすための置換候補
-            variation_patterns = [
-                (r"実は", "意外にも"),
-                (r"知ってました", "ご存知でした"),
-                (r"信じられない", "驚くべき"),
-                (r"調査によると", "研究結果によると"),
-                (r"データが示す", "統計から見えるのは"),
-                (r"○○%", "約○割"),
-            ]
-
             mutated = text
             # ランダムに1-2個の置換を適用
-            for old, new in random.sample(variation_patterns, min(2, len(variation_patterns))):
-                mutated = re.sub(old, new, mutated)
+            for pattern, new in random.sample(
+                _VARIATION_PATTERNS, min(2, len(_VARIATION_PATTERNS))
+            ):
+                mutated = pattern.sub(new, mutated)
 
             chosen_text = sanitize_and_limit(mutated, 140)
 
@@ -488,8 +768,7 @@ def main() -> int:
             "citations": citations,
             "hashtags": hashtags,
         }
-        append_markdown_preview(chosen_text, hashtags, citations, posted_url=None)
-        save_payload_json(payload)
+        writer.put(append_markdown_preview, chosen_text, hashtags, citations, None)
 
         logger.info(
             "投稿テキスト準備完了: %d文字 [%s/%s]",
@@ -504,31 +783,30 @@ def main() -> int:
 
     # === X (Twitter) 投稿 ===
     try:
-        client = tweepy.Client(
+        # X(Twitter) 非同期クライアント（tweepy[async] が必要）
+        from tweepy.asynchronous import AsyncClient
+
+        client = AsyncClient(
             consumer_key=x_api_key,
             consumer_secret=x_api_secret,
             access_token=x_access_token,
             access_token_secret=x_access_token_secret,
         )
-        res = client.create_tweet(text=chosen_text)
+        res = await client.create_tweet(text=chosen_text)
         tweet_id = res.data.get("id")
         tweet_url = f"https://x.com/i/web/status/{tweet_id}" if tweet_id else None
 
         payload["posted_at"] = datetime.now(timezone.utc).isoformat()
         payload["tweet_id"] = tweet_id
         payload["tweet_url"] = tweet_url
-        save_payload_json(payload)
-        append_markdown_preview(chosen_text, hashtags, citations, posted_url=tweet_url)
+        writer.put(save_payload_json, payload)  # 投稿結果を含めて1回だけ書き出す
+        writer.put(append_markdown_preview, chosen_text, hashtags, citations, tweet_url)
 
         logger.info("✓ 投稿成功: %s", tweet_url)
 
-        # 重複検出インデックスに追加
+        # 重複検出インデックスに追加（ファイルへの反映はMD追記の後に行う）
         try:
-            norm = normalize(chosen_text)
-            grams = char_ngrams(norm, 2)
-            index.append({"norm": norm, "simhash": simhash(grams)})
-            persist_index(index)
-            logger.info("重複検出インデックスを更新しました (+1)")
+            writer.put(persist_posted_entry, index.add(normalize(chosen_text)))
         except Exception as e:
             logger.warning("重複検出インデックスの更新に失敗: %s", e)
 
@@ -536,8 +814,26 @@ def main() -> int:
 
     except Exception as e:
         logger.exception("投稿に失敗しました: %s", e)
+        writer.put(save_payload_json, payload)
         return 4
 
 if __name__ == "__main__":
-    exit_code = main()
+    parser = argparse.ArgumentParser(description="AI投稿を生成してXに投稿する")
+    parser.add_argument(
+        "--resident",
+        action="store_true",
+        help="常駐モード（インデックスをメモリに保持して定期投稿）",
+    )
+    parser.add_argument(
+        "--interval", type=int, default=3600, help="常駐モードの投稿間隔（秒）"
+    )
+    args = parser.parse_args()
+
+    if args.resident:
+        try:
+            exit_code = asyncio.run(run_resident(args.interval))
+        except KeyboardInterrupt:
+            exit_code = 0
+    else:
+        exit_code = main()
     raise SystemExit(exit_code)
\ No newline at end of file
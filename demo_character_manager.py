@@ -6,7 +6,10 @@ Character Manager のデモスクリプト
 CharacterManagerの基本的な機能を実演します
 """
 
+import os
 import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # プロジェクトルートをパスに追加
@@ -27,7 +30,7 @@ def demo_basic_usage():
     print_section("1. 基本的な使い方")
 
     # CharacterManagerの初期化
-    manager = CharacterManager("data/character.yaml")
+    manager = CharacterManager.cached("data/character.yaml")
 
     # キャラクター情報の取得
     character = manager.get_character()
@@ -45,7 +48,7 @@ def demo_system_prompt():
     """システムプロンプトの生成デモ"""
     print_section("2. システムプロンプトの生成")
 
-    manager = CharacterManager("data/character.yaml")
+    manager = CharacterManager.cached("data/character.yaml")
     system_prompt = manager.get_system_prompt()
 
     print("生成されたシステムプロンプト:")
@@ -58,7 +61,7 @@ def demo_tweet_prompt_basic():
     """基本的な投稿プロンプトの生成デモ"""
     print_section("3. 基本的な投稿プロンプトの生成")
 
-    manager = CharacterManager("data/character.yaml")
+    manager = CharacterManager.cached("data/character.yaml")
     tweet_prompt = manager.generate_tweet_prompt()
 
     print("生成された投稿プロンプト:")
@@ -71,7 +74,7 @@ def demo_tweet_prompt_with_context():
     """コンテキスト付き投稿プロンプトの生成デモ"""
     print_section("4. コンテキスト付き投稿プロンプトの生成")
 
-    manager = CharacterManager("data/character.yaml")
+    manager = CharacterManager.cached("data/character.yaml")
 
     # コンテキスト情報を定義
     context = {
@@ -112,9 +115,21 @@ def demo_multiple_templates():
         ("テックプロフェッショナル", "data/templates/tech_professional.yaml"),
     ]
 
-    for name, path in templates:
-        if Path(path).exists():
-            manager = CharacterManager(path)
+    # 存在確認はファイルごとのstatではなく、ディレクトリごとに1回の走査で行う
+    existing = set()
+    for directory in {os.path.dirname(path) for _, path in templates}:
+        if os.path.isdir(directory):
+            existing.update(entry.path for entry in os.scandir(directory))
+
+    def load(path: str):
+        return CharacterManager.cached(path) if path in existing else None
+
+    # 各テンプレートの読み込みは独立しているので並行して行い、表示は元の順序で行う
+    with ThreadPoolExecutor(max_workers=len(templates)) as executor:
+        managers = list(executor.map(load, [path for _, path in templates]))
+
+    for (name, path), manager in zip(templates, managers):
+        if manager is not None:
             char = manager.get_character()
             print(f"\n【{name}】")
             print(f"  名前: {char.name}")
@@ -129,7 +144,7 @@ def demo_validation():
     """バリデーションのデモ"""
     print_section("6. 設定のバリデーション")
 
-    manager = CharacterManager("data/character.yaml")
+    manager = CharacterManager.cached("data/character.yaml")
 
     # バリデーションの実行
     is_valid = manager.validate_character_config()
@@ -153,7 +168,7 @@ def demo_update_and_save():
     """設定の更新と保存のデモ"""
     print_section("7. 設定の更新と保存")
 
-    manager = CharacterManager("data/character.yaml")
+    manager = CharacterManager.cached("data/character.yaml")
 
     print("元の設定:")
     char = manager.get_character()
@@ -169,8 +184,6 @@ def demo_update_and_save():
     print(f"  性格: {char.personality[:50]}...")
 
     # 一時ファイルに保存（実際のファイルを変更しないため）
-    import tempfile
-
     with tempfile.NamedTemporaryFile(
         mode="w", suffix=".yaml", delete=False
     ) as f:
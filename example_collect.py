@@ -7,11 +7,12 @@ Twitter Feedback Collector 使用例
 """
 
 import argparse
+import asyncio
 import logging
 import sys
 from datetime import datetime
 
-from modules.feedback_collector import FeedbackCollector
+from modules.feedback_collector import AsyncFeedbackCollector, FeedbackCollector
 
 # ロギング設定
 logging.basicConfig(
@@ -22,7 +23,11 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def collect_recent_and_analyze(days: int = 7, max_tweets: int = 100):
+# 詳細収集で同時に処理するツイート数の上限（レート制限対策）
+MAX_CONCURRENT_REQUESTS = 5
+
+
+async def collect_recent_and_analyze(days: int = 7, max_tweets: int = 100):
     """
     最近のツイートを収集して分析する
 
@@ -50,20 +55,31 @@ def collect_recent_and_analyze(days: int = 7, max_tweets: int = 100):
 
         # 2. 各ツイートのエンゲージメント詳細を収集
         logger.info(f"\n[2/4] Collecting detailed engagement data...")
-        for i, tweet in enumerate(tweets[:10], 1):  # 最大10件まで詳細収集
-            tweet_id = tweet['tweet_id']
-            logger.info(f"  [{i}/{min(10, len(tweets))}] Tweet {tweet_id}")
-
+        async_collector = AsyncFeedbackCollector(collector)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        target_ids = [t['tweet_id'] for t in tweets[:10]]  # 最大10件まで詳細収集
+
+        async def process(i: int, tweet_id: str) -> None:
+            async with semaphore:
+                logger.info(f"  [{i}/{len(target_ids)}] Replies for tweet {tweet_id}")
+                try:
+                    # 返信を収集（Free tierでは動作しない可能性あり）
+                    await async_collector.collect_replies(tweet_id, max_results=5)
+                except Exception as e:
+                    logger.warning(f"  Failed to collect replies for tweet {tweet_id}: {e}")
+
+        async def collect_engagement() -> None:
+            # エンゲージメントは1リクエストでまとめて取得する
             try:
-                # エンゲージメント情報を更新
-                collector.collect_tweet_engagement(tweet_id)
-
-                # 返信を収集（Free tierでは動作しない可能性あり）
-                collector.collect_replies(tweet_id, max_results=5)
-
+                await async_collector.collect_tweet_engagement_batch(target_ids)
             except Exception as e:
-                logger.warning(f"  Failed to collect data for tweet {tweet_id}: {e}")
-                continue
+                logger.warning(f"  Failed to collect engagement data: {e}")
+
+        # 返信はconversation_idごとの検索が必要なため、ツイート単位で並行実行する
+        await asyncio.gather(
+            collect_engagement(),
+            *(process(i, tid) for i, tid in enumerate(target_ids, 1)),
+        )
 
         # 3. エンゲージメント履歴を表示
         logger.info(f"\n[3/4] Engagement history for top tweets...")
@@ -208,6 +224,9 @@ def main():
         default=100,
         help='Maximum number of tweets to collect (default: 100)'
     )
+    collect_parser.set_defaults(
+        func=lambda a: asyncio.run(collect_recent_and_analyze(days=a.days, max_tweets=a.max_tweets))
+    )
 
     # update コマンド
     update_parser = subparsers.add_parser(
@@ -220,6 +239,7 @@ def main():
         default=24,
         help='Update tweets not updated in the last N hours (default: 24)'
     )
+    update_parser.set_defaults(func=lambda a: batch_update_old_tweets(hours=a.hours))
 
     # show コマンド
     show_parser = subparsers.add_parser(
@@ -231,6 +251,7 @@ def main():
         type=str,
         help='Tweet ID to show details for'
     )
+    show_parser.set_defaults(func=lambda a: show_tweet_details(a.tweet_id))
 
     args = parser.parse_args()
 
@@ -239,13 +260,7 @@ def main():
         return 0
 
     try:
-        if args.command == 'collect':
-            collect_recent_and_analyze(days=args.days, max_tweets=args.max_tweets)
-        elif args.command == 'update':
-            batch_update_old_tweets(hours=args.hours)
-        elif args.command == 'show':
-            show_tweet_details(args.tweet_id)
-
+        args.func(args)
         return 0
 
     except KeyboardInterrupt:
@@ -7,6 +7,7 @@ CharacterManagerを既存のauto_post.pyと統合する方法を示すサンプ
 """
 
 import sys
+from datetime import datetime
 from pathlib import Path
 
 # プロジェクトルートをパスに追加
@@ -23,7 +24,7 @@ def example_1_basic_integration():
     print()
 
     # CharacterManagerを初期化
-    char_manager = CharacterManager("data/character.yaml")
+    char_manager = CharacterManager.cached("data/character.yaml")
 
     # 既存のauto_post.pyのgenerate_with_openai関数を拡張する例
     print("【変更前】auto_post.pyのシステムプロンプト:")
@@ -51,7 +52,7 @@ def generate_with_openai_enhanced(base_prompt: str, model: str, api_key: str) ->
     client = OpenAI(api_key=api_key)
 
     # CharacterManagerからシステムプロンプトを取得
-    char_manager = CharacterManager("data/character.yaml")
+    char_manager = CharacterManager.cached("data/character.yaml")
     system_prompt = char_manager.get_system_prompt()
 
     resp = client.chat.completions.create(
@@ -76,7 +77,7 @@ def example_2_context_aware_generation():
     print("=" * 70)
     print()
 
-    char_manager = CharacterManager("data/character.yaml")
+    char_manager = CharacterManager.cached("data/character.yaml")
 
     # 過去の成功パターンを模擬
     successful_patterns = [
@@ -108,7 +109,7 @@ def example_2_context_aware_generation():
         """
 def main_enhanced():
     # CharacterManagerの初期化
-    char_manager = CharacterManager("data/character.yaml")
+    char_manager = CharacterManager.cached("data/character.yaml")
 
     # 過去の成功パターンを抽出
     successful_patterns = extract_successful_tweets_from_md()
@@ -143,9 +144,7 @@ def example_3_dynamic_character_switching():
     print()
 
     # 時間帯に応じてキャラクターを切り替える例
-    import datetime
-
-    current_hour = datetime.datetime.now().hour
+    current_hour = datetime.now().hour
 
     if 7 <= current_hour < 12:
         character_path = "data/templates/business_entrepreneur.yaml"
@@ -162,7 +161,7 @@ def example_3_dynamic_character_switching():
     print(f"コンテキスト: {time_context}")
     print()
 
-    char_manager = CharacterManager(character_path)
+    char_manager = CharacterManager.cached(character_path)
     character = char_manager.get_character()
 
     print(f"キャラクター名: {character.name}")
@@ -222,7 +221,7 @@ def example_4_topic_based_character():
     print(f"使用するキャラクター: {character_path}")
     print()
 
-    char_manager = CharacterManager(character_path)
+    char_manager = CharacterManager.cached(character_path)
     character = char_manager.get_character()
 
     print(f"キャラクター名: {character.name}")
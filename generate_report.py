@@ -14,6 +14,13 @@ from pathlib import Path
 
 from modules.analyzer import EngagementAnalyzer
 
+PREVIEW_LENGTH = 80
+
+
+def _preview(content: str) -> str:
+    """本文を先頭 PREVIEW_LENGTH 文字に切り詰める（切り詰めた場合は ... を付ける）"""
+    return content if len(content) <= PREVIEW_LENGTH else content[:PREVIEW_LENGTH] + "..."
+
 
 def generate_markdown_report(analyzer: EngagementAnalyzer) -> str:
     """
@@ -25,21 +32,24 @@ def generate_markdown_report(analyzer: EngagementAnalyzer) -> str:
     Returns:
         Markdown形式のレポート文字列
     """
+    # 全ツイートを1回だけ読み込み、以降の分析はすべてこのスナップショットから行う
+    rows = analyzer.load_snapshot()
+
     # 統計サマリー取得
-    summary = analyzer.get_stats_summary()
+    summary = analyzer.get_stats_summary(rows=rows)
 
     # トップツイート取得
-    top_by_likes = analyzer.get_top_tweets(limit=10, metric="likes")
-    top_by_engagement = analyzer.get_top_tweets(limit=5, metric="engagement")
+    top_by_likes = analyzer.get_top_tweets(limit=10, metric="likes", rows=rows)
+    top_by_engagement = analyzer.get_top_tweets(limit=5, metric="engagement", rows=rows)
 
     # 成功パターン抽出
-    features = analyzer.extract_successful_features()
+    features = analyzer.extract_successful_features(rows=rows)
 
     # 最適投稿時間
-    optimal_times = analyzer.get_optimal_posting_time()
+    optimal_times = analyzer.get_optimal_posting_time(rows=rows)
 
     # トピック分析
-    topic_performance = analyzer.analyze_topic_performance()
+    topic_performance = analyzer.analyze_topic_performance(rows=rows)
 
     # レポート生成
     report_lines = [
@@ -58,26 +68,21 @@ def generate_markdown_report(analyzer: EngagementAnalyzer) -> str:
         "\n### いいね数トップ10\n",
     ]
 
-    for i, tweet in enumerate(top_by_likes, 1):
-        report_lines.append(
-            f"{i}. **{tweet['likes']}** いいね | "
-            f"{tweet['retweets']} RT | "
-            f"{tweet['replies']} 返信\n"
-            f"   > {tweet['content'][:80]}{'...' if len(tweet['content']) > 80 else ''}\n"
-        )
+    report_lines.extend(
+        f"{i}. **{t['likes']}** いいね | {t['retweets']} RT | {t['replies']} 返信\n"
+        f"   > {_preview(t['content'])}\n"
+        for i, t in enumerate(top_by_likes, 1)
+    )
 
     report_lines.extend([
         "\n### エンゲージメント率トップ5\n",
     ])
 
-    for i, tweet in enumerate(top_by_engagement, 1):
-        engagement_pct = tweet['engagement_rate'] * 100
-        report_lines.append(
-            f"{i}. **{engagement_pct:.2f}%** | "
-            f"{tweet['likes']} いいね | "
-            f"{tweet['retweets']} RT\n"
-            f"   > {tweet['content'][:80]}{'...' if len(tweet['content']) > 80 else ''}\n"
-        )
+    report_lines.extend(
+        f"{i}. **{t['engagement_rate'] * 100:.2f}%** | {t['likes']} いいね | {t['retweets']} RT\n"
+        f"   > {_preview(t['content'])}\n"
+        for i, t in enumerate(top_by_engagement, 1)
+    )
 
     report_lines.extend([
         "\n---\n",
@@ -170,18 +175,17 @@ def main():
         print("まず、ツイートデータをデータベースに追加してください。", file=sys.stderr)
         return 1
 
-    # アナライザー初期化
-    analyzer = EngagementAnalyzer(db_path=args.db_path)
-
-    # 統計確認
-    summary = analyzer.get_stats_summary()
-    if summary["total_tweets"] == 0:
-        print("エラー: データベースにツイートデータがありません", file=sys.stderr)
-        print("まず、ツイートデータをデータベースに追加してください。", file=sys.stderr)
-        return 1
-
-    # レポート生成
-    report = generate_markdown_report(analyzer)
+    # アナライザー初期化（接続はレポート生成の間だけ使い回す）
+    with EngagementAnalyzer(db_path=args.db_path) as analyzer:
+        # 統計確認
+        summary = analyzer.get_stats_summary()
+        if summary["total_tweets"] == 0:
+            print("エラー: データベースにツイートデータがありません", file=sys.stderr)
+            print("まず、ツイートデータをデータベースに追加してください。", file=sys.stderr)
+            return 1
+
+        # レポート生成
+        report = generate_markdown_report(analyzer)
 
     # 出力
     if args.output:
@@ -4,13 +4,231 @@ Engagement Analyzer Module
 
 エンゲージメントデータを分析し、成功パターンを抽出するモジュール
 """
+import functools
+import heapq
+import os
 import re
 import sqlite3
-from collections import Counter, defaultdict
+from collections import Counter, OrderedDict, defaultdict
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# load_snapshot() が返す行の列順
+SNAPSHOT_COLUMNS = ("tweet_id", "content", "likes", "retweets", "replies", "impressions", "posted_at")
+_METRIC_COLUMN = {"likes": 2, "retweets": 3, "replies": 4}
+_ENGAGEMENT_SQL = "CAST(likes + retweets + replies AS FLOAT) / impressions"
+
+# 指標の列は NOT NULL ではないため None になり得る
+Row = Tuple[str, str, Optional[int], Optional[int], Optional[int], Optional[int], Optional[str]]
+
+# 絵文字（連続する絵文字は1つとして数える）
+_EMOJI_RE = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # 顔文字
+    "\U0001F300-\U0001F5FF"  # シンボル & ピクトグラム
+    "\U0001F680-\U0001F6FF"  # 交通 & 地図記号
+    "\U0001F1E0-\U0001F1FF"  # 国旗
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "]+",
+    flags=re.UNICODE
+)
+
+# 頻出単語（2文字以上のひらがな・カタカナ・漢字）
+_JP_WORD_RE = re.compile(r"[ぁ-んァ-ヶー一-龥]{2,}")
+
+# トピックキーワード辞書
+_TOPIC_KEYWORDS = {
+    "AI": ["AI", "人工知能", "機械学習", "ディープラーニング", "ChatGPT"],
+    "プログラミング": ["プログラミング", "コード", "開発", "エンジニア", "Python", "JavaScript"],
+    "ビジネス": ["ビジネス", "起業", "スタートアップ", "経営", "マーケティング"],
+    "生産性": ["生産性", "効率", "時間管理", "習慣", "ライフハック"],
+    "テクノロジー": ["テクノロジー", "技術", "イノベーション", "デジタル", "クラウド"],
+    "心理学": ["心理", "認知", "行動", "モチベーション", "メンタル"],
+    "科学": ["科学", "研究", "実験", "データ", "統計"],
+    "健康": ["健康", "運動", "睡眠", "栄養", "ウェルネス"]
+}
+_KEYWORD_TO_TOPIC = {kw: topic for topic, kws in _TOPIC_KEYWORDS.items() for kw in kws}
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick はオプション
+    _TOPIC_AUTOMATON = None
+else:
+    _TOPIC_AUTOMATON = ahocorasick.Automaton()
+    for _kw in _KEYWORD_TO_TOPIC:
+        _TOPIC_AUTOMATON.add_word(_kw, _kw)
+    _TOPIC_AUTOMATON.make_automaton()
+
+
+def _find_topic_keywords(text: str) -> List[str]:
+    """
+    テキスト中のトピックキーワードを出現回数分だけ返す
+
+    pyahocorasick があれば全キーワードを1回の走査で探す。キーワード同士が重なる箇所
+    （例: 「ビジネスタートアップ」）も、キーワードごとに str.count で数えた場合と同じく両方検出する。
+    """
+    if _TOPIC_AUTOMATON is not None:
+        return [kw for _, kw in _TOPIC_AUTOMATON.iter(text)]
+    return [kw for kw in _KEYWORD_TO_TOPIC for _ in range(text.count(kw))]
+
+
+# 時間帯別の平均エンゲージメント率の上位3件。
+# strftime('%H') はオフセット付きの時刻をUTCに変換してしまうため、記録された時刻の「時」を
+# 文字列から取り出す（日付のみの場合は0時）。同率の場合は先に現れた時間帯を優先する
+_HOURLY_ENGAGEMENT_SQL = f"""
+    SELECT hour, AVG({_ENGAGEMENT_SQL}) AS rate
+    FROM (
+        SELECT rowid AS rid, likes, retweets, replies, impressions, CASE
+            WHEN posted_at GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+            THEN 0
+            WHEN posted_at GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9][T ][0-9][0-9]*'
+            THEN CAST(substr(posted_at, 12, 2) AS INTEGER)
+        END AS hour
+        FROM tweets
+        WHERE posted_at IS NOT NULL AND impressions > 0
+    )
+    WHERE hour BETWEEN 0 AND 23
+    GROUP BY hour
+    ORDER BY rate DESC, MIN(rid)
+    LIMIT 3
+"""
+
+
+# tweets_agg の合計列と、対応する tweets の列
+_AGG_COLUMNS = (
+    ("sum_likes", "likes"),
+    ("sum_retweets", "retweets"),
+    ("sum_replies", "replies"),
+    ("total_impressions", "impressions"),
+)
+
+
+# AVG() の分母にする、NULLでない値の件数の列と、対応する tweets の列
+_AGG_COUNT_COLUMNS = (
+    ("cnt_likes", "likes"),
+    ("cnt_retweets", "retweets"),
+    ("cnt_replies", "replies"),
+)
+
+
+def _agg_set(delta: str, count_delta: str) -> str:
+    """
+    tweets_agg の各列を更新するSET句
+
+    合計列には増分式 delta を、件数列には count_delta を足す（{col} は tweets の列名に置き換える）。
+    """
+    return ", ".join(
+        [f"{agg} = {agg} {delta.format(col=col)}" for agg, col in _AGG_COLUMNS]
+        + [f"{agg} = {agg} {count_delta.format(col=col)}" for agg, col in _AGG_COUNT_COLUMNS]
+    )
+
+
+# INSERT OR REPLACE は置き換えられる行の DELETE トリガーを発火しない（recursive_triggers が無効の場合）ため、
+# tweets への書き込みは INSERT ... ON CONFLICT DO UPDATE で行うこと
+_AGG_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_agg_insert AFTER INSERT ON tweets BEGIN
+        UPDATE tweets_agg SET total_tweets = total_tweets + 1, {_agg_set(
+            "+ COALESCE(NEW.{col}, 0)", "+ (NEW.{col} IS NOT NULL)"
+        )};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_agg_update
+    AFTER UPDATE OF {", ".join(col for _, col in _AGG_COLUMNS)} ON tweets BEGIN
+        UPDATE tweets_agg SET {_agg_set(
+            "- COALESCE(OLD.{col}, 0) + COALESCE(NEW.{col}, 0)",
+            "- (OLD.{col} IS NOT NULL) + (NEW.{col} IS NOT NULL)",
+        )};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_agg_delete AFTER DELETE ON tweets BEGIN
+        UPDATE tweets_agg SET total_tweets = total_tweets - 1, {_agg_set(
+            "- COALESCE(OLD.{col}, 0)", "- (OLD.{col} IS NOT NULL)"
+        )};
+    END
+    """,
+)
+
+
+def _has_impressions(row: Row) -> bool:
+    """SQLの impressions > 0 と同じ判定（NULLは偽）"""
+    return row[5] is not None and row[5] > 0
+
+
+def _engagement_rate(row: Row) -> Optional[float]:
+    """
+    行のエンゲージメント率（インプレッションが無い場合は0）
+
+    SQLの式と同じく、いいね・リツイート・返信のいずれかがNULLならNoneを返す。
+    """
+    if not _has_impressions(row):
+        return 0
+    if row[2] is None or row[3] is None or row[4] is None:
+        return None
+    return (row[2] + row[3] + row[4]) / row[5]
+
+
+def _desc_key(value: Optional[float]) -> Tuple[bool, float]:
+    """ORDER BY ... DESC と同じくNULLを最後に回すソートキー"""
+    return (value is not None, value or 0)
+
+
+def _non_null(rows: List[Row], col: int) -> List:
+    """列 col のNULLでない値（SQLの集計関数と同じくNULLを除く）"""
+    return [r[col] for r in rows if r[col] is not None]
+
+
+# DBの内容が変わっていなければ分析結果を使い回す（キー: メソッド名・DBの版・スナップショット経由か）
+_CACHE_MAXSIZE = 32
+_result_cache: "OrderedDict[tuple, object]" = OrderedDict()
+_cache_counts = {"hits": 0, "misses": 0}
+
+
+def cache_stats() -> Dict[str, int]:
+    """分析結果キャッシュのヒット数・ミス数・保持件数を返す"""
+    return {**_cache_counts, "size": len(_result_cache)}
+
+
+def clear_cache() -> None:
+    """分析結果キャッシュを空にする"""
+    _result_cache.clear()
+    _cache_counts.update(hits=0, misses=0)
+
+
+def _mtime_cached(method):
+    """
+    DBファイルの更新時刻・サイズが変わるまで結果をキャッシュするデコレータ
+
+    rows を渡した呼び出しは、それが同じ版の load_snapshot() の返り値そのものである場合だけ
+    キャッシュする（任意の行リストを渡した場合は毎回計算する）。返り値は呼び出し元で共有されるので変更しないこと。
+    """
+    @functools.wraps(method)
+    def wrapper(self, rows=None):
+        version = self._data_version()
+        if version is None:
+            return method(self) if rows is None else method(self, rows)
+        if rows is not None and rows is not _result_cache.get(("load_snapshot", version, False)):
+            return method(self, rows)
+
+        key = (method.__name__, version, rows is not None)
+        if key in _result_cache:
+            _result_cache.move_to_end(key)
+            _cache_counts["hits"] += 1
+            return _result_cache[key]
+
+        _cache_counts["misses"] += 1
+        result = method(self) if rows is None else method(self, rows)
+        _result_cache[key] = result
+        while len(_result_cache) > _CACHE_MAXSIZE:
+            _result_cache.popitem(last=False)
+        return result
+
+    return wrapper
 
 
 @dataclass
@@ -26,7 +244,13 @@ class TweetStats:
 
 
 class EngagementAnalyzer:
-    """エンゲージメント分析クラス"""
+    """
+    エンゲージメント分析クラス
+
+    接続は初期化時に1度だけ開き、close() まで使い回す。レポートのように複数の分析を
+    まとめて行う場合は load_snapshot() で全行を1回だけ読み、各メソッドの rows に渡す。
+    load_snapshot() と重い分析メソッドの結果は、DBファイルが変わるまでモジュール内にキャッシュされる。
+    """
 
     def __init__(self, db_path: str = "data/tweets.db"):
         """
@@ -36,13 +260,33 @@ class EngagementAnalyzer:
             db_path: データベースファイルのパス
         """
         self.db_path = db_path
+        self.conn: Optional[sqlite3.Connection] = None
         self._ensure_database()
 
+    def __enter__(self) -> "EngagementAnalyzer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
     def _ensure_database(self) -> None:
         """データベースとテーブルの存在を確認、必要なら作成"""
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-
-        with sqlite3.connect(self.db_path) as conn:
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # 読み込み中心なので、ページはmmap経由で読みソート用の一時領域もメモリに置く
+        self.conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        self.conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+
+        with self.conn as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS tweets (
@@ -56,7 +300,83 @@ class EngagementAnalyzer:
                     created_at TEXT DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            conn.commit()
+            # トップN取得（ORDER BY ... DESC LIMIT）を索引の先頭K件の読み出しで済ませる
+            for metric in _METRIC_COLUMN:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_tweets_{metric} ON tweets({metric} DESC)"
+                )
+            # エンゲージメント率の式インデックス（get_top_tweets の式と完全に一致させること）
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_tweets_engagement
+                ON tweets({_ENGAGEMENT_SQL} DESC) WHERE impressions > 0
+            """)
+            # get_stats_summary 用の集計値（1行）をトリガーで保守する。
+            # 平均は AVG() と同じくNULLを除いて求めるため、列ごとにNULLでない件数も持つ。
+            # 最大いいね数は idx_tweets_likes から直接引けるので持たない
+            agg_columns = {row[1] for row in cursor.execute("PRAGMA table_info(tweets_agg)")}
+            if agg_columns and not agg_columns.issuperset(agg for agg, _ in _AGG_COUNT_COLUMNS):
+                # 件数列の無い旧形式の集計テーブルは、トリガーごと作り直す
+                for trigger in ("insert", "update", "delete"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS trg_tweets_agg_{trigger}")
+                cursor.execute("DROP TABLE tweets_agg")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS tweets_agg (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    total_tweets INTEGER NOT NULL,
+                    sum_likes INTEGER NOT NULL,
+                    sum_retweets INTEGER NOT NULL,
+                    sum_replies INTEGER NOT NULL,
+                    total_impressions INTEGER NOT NULL,
+                    cnt_likes INTEGER NOT NULL,
+                    cnt_retweets INTEGER NOT NULL,
+                    cnt_replies INTEGER NOT NULL
+                )
+            """)
+            # 既存のDBでは初回だけ全件から集計する
+            cursor.execute(f"""
+                INSERT OR IGNORE INTO tweets_agg
+                (id, total_tweets, {', '.join(agg for agg, _ in _AGG_COLUMNS + _AGG_COUNT_COLUMNS)})
+                SELECT 0, COUNT(*),
+                    {', '.join(f'COALESCE(SUM({col}), 0)' for _, col in _AGG_COLUMNS)},
+                    {', '.join(f'COUNT({col})' for _, col in _AGG_COUNT_COLUMNS)}
+                FROM tweets
+            """)
+            for trigger in _AGG_TRIGGERS:
+                cursor.execute(trigger)
+
+    def _data_version(self) -> Optional[Tuple]:
+        """
+        DBの内容の版を表すキー（DBファイルが無い場合はNone）
+
+        WALに未反映の書き込みがあれば -wal ファイルの状態も含める。自分の接続での書き込みは
+        タイムスタンプの分解能に関係なく検出できるよう total_changes も含める。
+        """
+        path = os.path.abspath(self.db_path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        version: Tuple = (path, st.st_mtime_ns, st.st_size, self.conn.total_changes)
+        try:
+            wal = os.stat(path + "-wal")
+        except OSError:
+            return version
+        if wal.st_size:
+            version += (wal.st_mtime_ns, wal.st_size)
+        return version
+
+    @_mtime_cached
+    def load_snapshot(self) -> List[Row]:
+        """
+        全ツイートを1回のクエリで読み込む
+
+        DBが変わっていなければ前回と同じリストを返す（変更しないこと）。
+
+        Returns:
+            SNAPSHOT_COLUMNS の順に並んだ行のリスト
+        """
+        cursor = self.conn.execute(f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM tweets")
+        return cursor.fetchall()
 
     def add_tweet(
         self,
@@ -80,22 +400,41 @@ class EngagementAnalyzer:
             impressions: インプレッション数
             posted_at: 投稿日時
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO tweets
+        self.add_tweets([(tweet_id, content, likes, retweets, replies, impressions, posted_at)])
+
+    def add_tweets(self, rows: Iterable[Row]) -> None:
+        """
+        複数のツイートを1つのトランザクションでまとめて追加
+
+        Args:
+            rows: SNAPSHOT_COLUMNS の順に並んだタプル
+                (tweet_id, content, likes, retweets, replies, impressions, posted_at)
+        """
+        with self.conn as conn:
+            # 既存のIDは上書きする（INSERT OR REPLACE だと tweets_agg のトリガーが削除分を数えない）
+            conn.executemany("""
+                INSERT INTO tweets
                 (tweet_id, content, likes, retweets, replies, impressions, posted_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (tweet_id, content, likes, retweets, replies, impressions, posted_at))
-            conn.commit()
-
-    def get_top_tweets(self, limit: int = 10, metric: str = "likes") -> List[Dict]:
+                ON CONFLICT(tweet_id) DO UPDATE SET
+                    content = excluded.content,
+                    likes = excluded.likes,
+                    retweets = excluded.retweets,
+                    replies = excluded.replies,
+                    impressions = excluded.impressions,
+                    posted_at = excluded.posted_at
+            """, rows)
+
+    def get_top_tweets(
+        self, limit: int = 10, metric: str = "likes", rows: Optional[List[Row]] = None
+    ) -> List[Dict]:
         """
         指標に基づいてトップツイートを取得
 
         Args:
             limit: 取得件数
             metric: 並び替え指標 ("likes", "retweets", "replies", "engagement")
+            rows: load_snapshot() の結果。指定した場合はDBを読まずにこの中から選ぶ
 
         Returns:
             トップツイートのリスト
@@ -104,56 +443,65 @@ class EngagementAnalyzer:
         if metric not in valid_metrics:
             raise ValueError(f"metric must be one of {valid_metrics}")
 
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
+        if rows is not None:
             if metric == "engagement":
-                # エンゲージメント率でソート
-                query = """
-                    SELECT
-                        tweet_id, content, likes, retweets, replies, impressions, posted_at,
-                        CASE
-                            WHEN impressions > 0
-                            THEN CAST(likes + retweets + replies AS FLOAT) / impressions
-                            ELSE 0
-                        END as engagement_rate
-                    FROM tweets
-                    WHERE impressions > 0
-                    ORDER BY engagement_rate DESC
-                    LIMIT ?
-                """
+                top = heapq.nlargest(
+                    limit,
+                    filter(_has_impressions, rows),
+                    key=lambda r: _desc_key(_engagement_rate(r)),
+                )
             else:
-                # 指定された指標でソート
-                query = f"""
-                    SELECT
-                        tweet_id, content, likes, retweets, replies, impressions, posted_at,
-                        CASE
-                            WHEN impressions > 0
-                            THEN CAST(likes + retweets + replies AS FLOAT) / impressions
-                            ELSE 0
-                        END as engagement_rate
-                    FROM tweets
-                    ORDER BY {metric} DESC
-                    LIMIT ?
-                """
-
-            cursor.execute(query, (limit,))
-            rows = cursor.fetchall()
-
+                col = _METRIC_COLUMN[metric]
+                top = heapq.nlargest(limit, rows, key=lambda r: _desc_key(r[col]))
             return [
-                {
-                    "tweet_id": row[0],
-                    "content": row[1],
-                    "likes": row[2],
-                    "retweets": row[3],
-                    "replies": row[4],
-                    "impressions": row[5],
-                    "posted_at": row[6],
-                    "engagement_rate": row[7]
-                }
-                for row in rows
+                {**dict(zip(SNAPSHOT_COLUMNS, r)), "engagement_rate": _engagement_rate(r)}
+                for r in top
             ]
 
+        cursor = self.conn.cursor()
+        if metric == "engagement":
+            # エンゲージメント率でソート（impressions > 0 に絞るので、式インデックスと同じ式をそのまま使う）
+            query = f"""
+                SELECT
+                    tweet_id, content, likes, retweets, replies, impressions, posted_at,
+                    {_ENGAGEMENT_SQL} as engagement_rate
+                FROM tweets
+                WHERE impressions > 0
+                ORDER BY engagement_rate DESC
+                LIMIT ?
+            """
+        else:
+            # 指定された指標でソート
+            query = f"""
+                SELECT
+                    tweet_id, content, likes, retweets, replies, impressions, posted_at,
+                    CASE
+                        WHEN impressions > 0
+                        THEN CAST(likes + retweets + replies AS FLOAT) / impressions
+                        ELSE 0
+                    END as engagement_rate
+                FROM tweets
+                ORDER BY {metric} DESC
+                LIMIT ?
+            """
+
+        cursor.execute(query, (limit,))
+        rows = cursor.fetchall()
+
+        return [
+            {
+                "tweet_id": row[0],
+                "content": row[1],
+                "likes": row[2],
+                "retweets": row[3],
+                "replies": row[4],
+                "impressions": row[5],
+                "posted_at": row[6],
+                "engagement_rate": row[7]
+            }
+            for row in rows
+        ]
+
     def analyze_tweet_patterns(self, tweet_ids: List[str]) -> Dict:
         """
         指定されたツイートのパターンを分析
@@ -175,48 +523,39 @@ class EngagementAnalyzer:
                 "topics": []
             }
 
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            placeholders = ",".join("?" * len(tweet_ids))
-            cursor.execute(
-                f"SELECT content FROM tweets WHERE tweet_id IN ({placeholders})",
-                tweet_ids
-            )
-            rows = cursor.fetchall()
-
-        contents = [row[0] for row in rows]
-
-        # 文字数の平均
-        avg_length = sum(len(c) for c in contents) / len(contents) if contents else 0
-
-        # 絵文字カウント
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # 顔文字
-            "\U0001F300-\U0001F5FF"  # シンボル & ピクトグラム
-            "\U0001F680-\U0001F6FF"  # 交通 & 地図記号
-            "\U0001F1E0-\U0001F1FF"  # 国旗
-            "\U00002702-\U000027B0"
-            "\U000024C2-\U0001F251"
-            "]+",
-            flags=re.UNICODE
+        placeholders = ",".join("?" * len(tweet_ids))
+        cursor = self.conn.execute(
+            f"SELECT content FROM tweets WHERE tweet_id IN ({placeholders}) ORDER BY tweet_id",
+            tweet_ids
         )
-        emoji_count = sum(len(emoji_pattern.findall(c)) for c in contents)
+        contents = [row[0] for row in cursor.fetchall()]
+        return self._analyze_contents(contents)
 
-        # ハッシュタグカウント
-        hashtag_count = sum(c.count("#") for c in contents)
+    def _analyze_contents(self, contents: List[str]) -> Dict:
+        """
+        ツイート本文のリストからパターンを分析
 
-        # 質問形式ツイート
-        question_tweets = sum(1 for c in contents if "?" in c or "？" in c)
-        statement_tweets = len(contents) - question_tweets
+        Args:
+            contents: ツイート内容のリスト
 
-        # 頻出単語抽出（簡易版: 2文字以上のひらがな・カタカナ・漢字）
-        word_pattern = re.compile(r"[ぁ-んァ-ヶー一-龥]{2,}")
-        all_words = []
+        Returns:
+            パターン分析結果
+        """
+        # 文字数・絵文字・ハッシュタグ・質問形式・頻出単語（2文字以上のひらがな・カタカナ・漢字）を
+        # 1回のループでまとめて数える
+        total_length = emoji_count = hashtag_count = question_tweets = 0
+        word_counts: Counter = Counter()
         for c in contents:
-            all_words.extend(word_pattern.findall(c))
-
-        common_words = [word for word, _ in Counter(all_words).most_common(10)]
+            total_length += len(c)
+            emoji_count += len(_EMOJI_RE.findall(c))
+            hashtag_count += c.count("#")
+            if "?" in c or "？" in c:
+                question_tweets += 1
+            word_counts.update(_JP_WORD_RE.findall(c))
+
+        avg_length = total_length / len(contents) if contents else 0
+        statement_tweets = len(contents) - question_tweets
+        common_words = [word for word, _ in word_counts.most_common(10)]
 
         # トピック抽出（簡易版: キーワードベース）
         topics = self._extract_topics(contents)
@@ -241,41 +580,33 @@ class EngagementAnalyzer:
         Returns:
             抽出されたトピックリスト
         """
-        # トピックキーワード辞書
-        topic_keywords = {
-            "AI": ["AI", "人工知能", "機械学習", "ディープラーニング", "ChatGPT"],
-            "プログラミング": ["プログラミング", "コード", "開発", "エンジニア", "Python", "JavaScript"],
-            "ビジネス": ["ビジネス", "起業", "スタートアップ", "経営", "マーケティング"],
-            "生産性": ["生産性", "効率", "時間管理", "習慣", "ライフハック"],
-            "テクノロジー": ["テクノロジー", "技術", "イノベーション", "デジタル", "クラウド"],
-            "心理学": ["心理", "認知", "行動", "モチベーション", "メンタル"],
-            "科学": ["科学", "研究", "実験", "データ", "統計"],
-            "健康": ["健康", "運動", "睡眠", "栄養", "ウェルネス"]
-        }
-
-        topic_counts = defaultdict(int)
-        text = " ".join(contents)
-
-        for topic, keywords in topic_keywords.items():
-            for keyword in keywords:
-                topic_counts[topic] += text.count(keyword)
+        # 同数のトピックは辞書の定義順に並べるため、全トピックを0で初期化しておく
+        topic_counts = dict.fromkeys(_TOPIC_KEYWORDS, 0)
+        for keyword in _find_topic_keywords(" ".join(contents)):
+            topic_counts[_KEYWORD_TO_TOPIC[keyword]] += 1
 
         # カウント数でソートして上位を返す
         sorted_topics = sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)
         return [topic for topic, count in sorted_topics if count > 0][:5]
 
-    def extract_successful_features(self) -> Dict:
+    @_mtime_cached
+    def extract_successful_features(self, rows: Optional[List[Row]] = None) -> Dict:
         """
         成功しているツイートの特徴を抽出
 
+        Args:
+            rows: load_snapshot() の結果。指定した場合はDBを読まずに分析する
+
         Returns:
             成功パターンの特徴
         """
         # 上位20%のツイートを成功ツイートとして定義
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM tweets WHERE impressions > 0")
-            total_count = cursor.fetchone()[0]
+        if rows is not None:
+            total_count = sum(1 for r in rows if _has_impressions(r))
+        else:
+            total_count = self.conn.execute(
+                "SELECT COUNT(*) FROM tweets WHERE impressions > 0"
+            ).fetchone()[0]
 
         if total_count == 0:
             return {
@@ -285,7 +616,7 @@ class EngagementAnalyzer:
             }
 
         top_limit = max(10, int(total_count * 0.2))
-        top_tweets = self.get_top_tweets(limit=top_limit, metric="engagement")
+        top_tweets = self.get_top_tweets(limit=top_limit, metric="engagement", rows=rows)
 
         if not top_tweets:
             return {
@@ -294,9 +625,11 @@ class EngagementAnalyzer:
                 "recommended_features": []
             }
 
-        # パターン分析
-        tweet_ids = [t["tweet_id"] for t in top_tweets]
-        patterns = self.analyze_tweet_patterns(tweet_ids)
+        # パターン分析（本文は取得済みなので、analyze_tweet_patterns のようにDBから読み直さない）
+        # analyze_tweet_patterns と同じく tweet_id 順で渡す（頻出語の同数時の順序を揃える）
+        tweet_ids = sorted(t["tweet_id"] for t in top_tweets)
+        contents = {t["tweet_id"]: t["content"] for t in top_tweets}
+        patterns = self._analyze_contents([contents[tweet_id] for tweet_id in tweet_ids])
 
         # 推奨事項生成
         recommendations = []
@@ -323,101 +656,94 @@ class EngagementAnalyzer:
             "recommended_features": recommendations
         }
 
-    def get_optimal_posting_time(self) -> List[str]:
+    @_mtime_cached
+    def get_optimal_posting_time(self, rows: Optional[List[Row]] = None) -> List[str]:
         """
         過去のツイートの時間帯別エンゲージメント率を分析
 
+        Args:
+            rows: load_snapshot() の結果。指定した場合はDBを読まずに分析する
+
         Returns:
             最適な投稿時間帯のリスト
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT posted_at, likes, retweets, replies, impressions
-                FROM tweets
-                WHERE posted_at IS NOT NULL AND impressions > 0
-            """)
-            rows = cursor.fetchall()
+        if rows is None:
+            # 時間帯の抽出から平均・並べ替えまでSQLiteで行う
+            top_hours = [hour for hour, _ in self.conn.execute(_HOURLY_ENGAGEMENT_SQL)]
+        else:
+            top_hours = self._top_hours_from_rows(rows)
 
-        if not rows:
-            return []
+        # 上位3つの時間帯を返す
+        optimal_times = []
+        for hour in top_hours:
+            start_hour = f"{hour:02d}:00"
+            end_hour = f"{(hour + 1) % 24:02d}:00"
+            optimal_times.append(f"{start_hour}-{end_hour}")
+
+        return optimal_times
 
-        # 時間帯別のエンゲージメント率を計算
-        hourly_engagement = defaultdict(list)
+    @staticmethod
+    def _top_hours_from_rows(rows: List[Row]) -> List[int]:
+        """スナップショットから _HOURLY_ENGAGEMENT_SQL と同じ基準で上位3つの時間帯を求める"""
+        # 時間帯別のエンゲージメント率の合計と件数（挿入順が同率時の順序になる）
+        hourly_engagement: Dict[int, Tuple[float, int]] = {}
 
         for row in rows:
-            posted_at_str = row[0]
-            likes, retweets, replies, impressions = row[1], row[2], row[3], row[4]
-
+            posted_at = row[6]
+            if posted_at is None or not _has_impressions(row):
+                continue
             try:
-                # ISO形式の日時をパース
-                posted_at = datetime.fromisoformat(posted_at_str.replace("Z", "+00:00"))
-                hour = posted_at.hour
-
-                engagement_rate = (likes + retweets + replies) / impressions if impressions > 0 else 0
-                hourly_engagement[hour].append(engagement_rate)
+                # ISO形式の日時をパース（時刻は記録されたオフセットのまま扱う）
+                hour = datetime.fromisoformat(posted_at.replace("Z", "+00:00")).hour
             except (ValueError, AttributeError):
                 continue
-
-        # 各時間帯の平均エンゲージメント率を計算
-        avg_hourly_engagement = {
-            hour: sum(rates) / len(rates)
-            for hour, rates in hourly_engagement.items()
-        }
-
-        # エンゲージメント率でソート
+            total, count = hourly_engagement.get(hour, (0, 0))
+            rate = _engagement_rate(row)
+            # SQLの AVG() と同じく、率がNULLの行は平均に含めない（時間帯自体は候補に残す）
+            if rate is not None:
+                total, count = total + rate, count + 1
+            hourly_engagement[hour] = (total, count)
+
+        # 平均エンゲージメント率でソート（率が全てNULLの時間帯は最後）
         sorted_hours = sorted(
-            avg_hourly_engagement.items(),
-            key=lambda x: x[1],
+            hourly_engagement.items(),
+            key=lambda x: _desc_key(x[1][0] / x[1][1] if x[1][1] else None),
             reverse=True
         )
+        return [hour for hour, _ in sorted_hours[:3]]
 
-        # 上位3つの時間帯を返す
-        optimal_times = []
-        for hour, _ in sorted_hours[:3]:
-            start_hour = f"{hour:02d}:00"
-            end_hour = f"{(hour + 1) % 24:02d}:00"
-            optimal_times.append(f"{start_hour}-{end_hour}")
-
-        return optimal_times
-
-    def analyze_topic_performance(self) -> Dict:
+    @_mtime_cached
+    def analyze_topic_performance(self, rows: Optional[List[Row]] = None) -> Dict:
         """
         トピック別のパフォーマンスを分析
 
+        Args:
+            rows: load_snapshot() の結果。指定した場合はDBを読まずに分析する
+
         Returns:
             トピック別の統計情報
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
+        if rows is not None:
+            rows = [(r[1], r[2], r[3], r[4]) for r in rows]
+        else:
+            rows = self.conn.execute("""
                 SELECT content, likes, retweets, replies
                 FROM tweets
-            """)
-            rows = cursor.fetchall()
+            """).fetchall()
 
         if not rows:
             return {}
 
-        # トピックキーワード辞書
-        topic_keywords = {
-            "AI": ["AI", "人工知能", "機械学習", "ディープラーニング", "ChatGPT"],
-            "プログラミング": ["プログラミング", "コード", "開発", "エンジニア", "Python", "JavaScript"],
-            "ビジネス": ["ビジネス", "起業", "スタートアップ", "経営", "マーケティング"],
-            "生産性": ["生産性", "効率", "時間管理", "習慣", "ライフハック"],
-            "テクノロジー": ["テクノロジー", "技術", "イノベーション", "デジタル", "クラウド"],
-            "心理学": ["心理", "認知", "行動", "モチベーション", "メンタル"],
-            "科学": ["科学", "研究", "実験", "データ", "統計"],
-            "健康": ["健康", "運動", "睡眠", "栄養", "ウェルネス"]
-        }
-
         topic_stats = defaultdict(lambda: {"count": 0, "total_likes": 0})
 
         for row in rows:
             content, likes, retweets, replies = row
 
-            for topic, keywords in topic_keywords.items():
-                if any(keyword in content for keyword in keywords):
+            hits = {_KEYWORD_TO_TOPIC[keyword] for keyword in _find_topic_keywords(content)}
+            if not hits:
+                continue
+            for topic in _TOPIC_KEYWORDS:
+                if topic in hits:
                     topic_stats[topic]["count"] += 1
                     topic_stats[topic]["total_likes"] += likes
 
@@ -433,26 +759,47 @@ class EngagementAnalyzer:
         # 平均いいね数でソート
         return dict(sorted(result.items(), key=lambda x: x[1]["avg_likes"], reverse=True))
 
-    def get_stats_summary(self) -> Dict:
+    def get_stats_summary(self, rows: Optional[List[Row]] = None) -> Dict:
         """
         全体統計サマリーを取得
 
+        Args:
+            rows: load_snapshot() の結果。指定した場合はDBを読まずに集計する
+
         Returns:
             統計サマリー
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
+        if rows is not None:
+            # AVG / MAX / SUM と同じくNULLの値は除いて集計する
+            likes, retweets, replies = (_non_null(rows, col) for col in (2, 3, 4))
+            row = (
+                len(rows),
+                sum(likes) / len(likes) if likes else None,
+                sum(retweets) / len(retweets) if retweets else None,
+                sum(replies) / len(replies) if replies else None,
+                max(likes, default=None),
+                sum(_non_null(rows, 5)),
+            )
+        else:
+            # トリガーで保守している集計行と索引からの最大値を読むだけで、全件は走査しない
+            (
+                n, likes, retweets, replies, impressions,
+                n_likes, n_retweets, n_replies, max_likes,
+            ) = self.conn.execute("""
                 SELECT
-                    COUNT(*) as total_tweets,
-                    AVG(likes) as avg_likes,
-                    AVG(retweets) as avg_retweets,
-                    AVG(replies) as avg_replies,
-                    MAX(likes) as max_likes,
-                    SUM(impressions) as total_impressions
-                FROM tweets
-            """)
-            row = cursor.fetchone()
+                    total_tweets, sum_likes, sum_retweets, sum_replies, total_impressions,
+                    cnt_likes, cnt_retweets, cnt_replies,
+                    (SELECT MAX(likes) FROM tweets)
+                FROM tweets_agg
+            """).fetchone()
+            row = (
+                n,
+                likes / n_likes if n_likes else None,
+                retweets / n_retweets if n_retweets else None,
+                replies / n_replies if n_replies else None,
+                max_likes,
+                impressions,
+            )
 
         return {
             "total_tweets": row[0] or 0,
@@ -5,17 +5,29 @@ Character Manager Module
 AI botのキャラクター設定を管理し、プロンプト生成に活用するモジュール
 """
 
+import copy
+import json
 import logging
+import os
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import yaml
 
+try:
+    # libyaml が使える場合はC実装のローダー・ダンパーを使う（純Python版より大幅に速い）
+    from yaml import CSafeDumper as _YAMLDumper
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:  # pragma: no cover - libyaml なしでビルドされた PyYAML
+    from yaml import SafeDumper as _YAMLDumper
+    from yaml import SafeLoader as _YAMLLoader
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class Character:
     """キャラクター設定を保持するデータクラス"""
 
@@ -53,24 +65,180 @@ class Character:
         }
 
 
+# get_system_prompt の骨組み（話し方のスタイル・制約事項のブロックは設定がある場合だけ入る）
+_SYSTEM_PROMPT_TEMPLATE = (
+    "あなたは「{name}」という名前のAI botです。\n"
+    "\n"
+    "【性格・個性】\n"
+    "{personality}\n"
+    "\n"
+    "【トーン・話し方】\n"
+    "{tone}\n"
+    "\n"
+    "【知識レベル】\n"
+    "{knowledge_level}\n"
+    "\n"
+    "【興味・関心分野】\n"
+    "{interests}"
+    "{speaking_style}"
+    "{constraints}\n"
+    "\n"
+    "これらの設定に従って、魅力的で価値のある投稿を作成してください。"
+)
+
+_EMOJI_FREQUENCY_DESC = {
+    "low": "控えめに",
+    "moderate": "適度に",
+    "high": "積極的に",
+}
+
+
+def _cache_path(config_path: Path) -> Path:
+    """YAMLの解析結果を保存するキャッシュファイルのパス"""
+    return config_path.with_name(config_path.name + ".cache.json")
+
+
+def _read_cache(cache_path: Path, stat: os.stat_result) -> Optional[Dict]:
+    """
+    YAMLの解析結果のキャッシュを読み込む
+
+    キャッシュ作成時の設定ファイルの更新時刻・サイズが一致しない場合は None を返す。
+    """
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if cached.get("mtime_ns") != stat.st_mtime_ns or cached.get("size") != stat.st_size:
+        return None
+    return cached.get("config")
+
+
+def _write_cache(cache_path: Path, stat: os.stat_result, raw_config: Any) -> None:
+    """YAMLの解析結果をJSONで保存する（書き込めない場合は何もしない）"""
+    try:
+        cache_path.write_text(
+            json.dumps(
+                {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "config": raw_config},
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+    except (OSError, TypeError, ValueError) as e:
+        logger.debug("キャラクター設定のキャッシュを保存できませんでした: %s", e)
+
+
+def _build_character(raw_config: Dict) -> Character:
+    """YAMLの内容からCharacterを構築する（リスト・辞書は raw_config と共有する）"""
+    char_data = raw_config["character"]
+    return Character(
+        name=char_data.get("name", ""),
+        personality=char_data.get("personality", ""),
+        tone=char_data.get("tone", ""),
+        interests=char_data.get("interests", []),
+        knowledge_level=char_data.get("knowledge_level", ""),
+        speaking_style=char_data.get("speaking_style", {}),
+        constraints=char_data.get("constraints", {}),
+    )
+
+
+def _parse_config(config_path: Path) -> Tuple[Dict, Character]:
+    """
+    キャラクター設定ファイルを読み込んでCharacterを構築する
+
+    PyYAMLでの解析結果は設定ファイルの隣にJSONで保存し（<ファイル名>.cache.json）、
+    設定ファイルが変更されていなければ次回以降はそちらを読み込む。
+
+    Args:
+        config_path: キャラクター設定ファイルのパス
+
+    Returns:
+        (YAMLの内容, Character)
+
+    Raises:
+        ValueError: 設定ファイルの形式が不正な場合
+    """
+    try:
+        stat = config_path.stat()
+        cache_path = _cache_path(config_path)
+        raw_config = _read_cache(cache_path, stat)
+        if raw_config is None:
+            with config_path.open("r", encoding="utf-8") as f:
+                raw_config = yaml.load(f, Loader=_YAMLLoader)
+            _write_cache(cache_path, stat, raw_config)
+
+        if not raw_config or "character" not in raw_config:
+            raise ValueError(
+                "設定ファイルに'character'キーが見つかりません"
+            )
+
+        character = _build_character(raw_config)
+        logger.info("キャラクター設定を読み込みました: %s", character.name)
+        return raw_config, character
+
+    except yaml.YAMLError as e:
+        raise ValueError(f"YAML解析エラー: {e}")
+    except Exception as e:
+        raise ValueError(f"キャラクター設定の読み込みに失敗しました: {e}")
+
+
+@lru_cache(maxsize=16)
+def _load_config_cached(resolved_path: str, mtime_ns: int) -> Dict:
+    """
+    絶対パスと更新時刻をキーに、検証済みのYAMLの内容をキャッシュする
+
+    戻り値は全インスタンスで共有されるため、呼び出し側で複製してから使うこと。
+    """
+    raw_config, _ = _parse_config(Path(resolved_path))
+    return raw_config
+
+
 class CharacterManager:
     """キャラクター設定を管理するクラス"""
 
-    def __init__(self, config_path: str = "data/character.yaml"):
+    def __init__(self, config_path: str = "data/character.yaml", autoload: bool = True):
         """
         CharacterManagerを初期化する
 
         Args:
             config_path: キャラクター設定ファイルのパス
+            autoload: 設定ファイルが存在する場合に自動ロードするか
         """
         self.config_path = Path(config_path)
         self._character: Optional[Character] = None
         self._raw_config: Optional[Dict] = None
+        # get_system_prompt / get_personality_description の結果（キャラクターが変わるとクリア）
+        self._system_prompt_cache: Optional[str] = None
+        self._personality_cache: Optional[str] = None
 
         # 設定ファイルが存在する場合は自動ロード
-        if self.config_path.exists():
+        if autoload and self.config_path.exists():
             self.load_character()
 
+    @classmethod
+    def cached(cls, config_path: str = "data/character.yaml") -> "CharacterManager":
+        """
+        同じ設定ファイルの読み込み結果を再利用してCharacterManagerを作成する
+
+        ファイルの絶対パスと更新時刻をキーにキャッシュするため、
+        ファイルが編集されていれば読み込み直す。キャッシュするのはYAMLの内容だけで、
+        インスタンスごとに複製してからCharacterを作るため、変更は他のインスタンスに影響しない。
+
+        Args:
+            config_path: キャラクター設定ファイルのパス
+
+        Returns:
+            CharacterManager: 読み込み済みのインスタンス
+        """
+        path = Path(config_path)
+        if not path.exists():
+            return cls(config_path)
+        manager = cls(config_path, autoload=False)
+        manager._raw_config = copy.deepcopy(
+            _load_config_cached(str(path.resolve()), path.stat().st_mtime_ns)
+        )
+        manager._character = _build_character(manager._raw_config)
+        return manager
+
     def load_character(self) -> Character:
         """
         キャラクター設定をYAMLファイルから読み込む
@@ -87,37 +255,14 @@ class CharacterManager:
                 f"キャラクター設定ファイルが見つかりません: {self.config_path}"
             )
 
-        try:
-            with self.config_path.open("r", encoding="utf-8") as f:
-                self._raw_config = yaml.safe_load(f)
-
-            if not self._raw_config or "character" not in self._raw_config:
-                raise ValueError(
-                    "設定ファイルに'character'キーが見つかりません"
-                )
-
-            char_data = self._raw_config["character"]
-
-            # Characterオブジェクトを構築
-            self._character = Character(
-                name=char_data.get("name", ""),
-                personality=char_data.get("personality", ""),
-                tone=char_data.get("tone", ""),
-                interests=char_data.get("interests", []),
-                knowledge_level=char_data.get("knowledge_level", ""),
-                speaking_style=char_data.get("speaking_style", {}),
-                constraints=char_data.get("constraints", {}),
-            )
-
-            logger.info(
-                "キャラクター設定を読み込みました: %s", self._character.name
-            )
-            return self._character
+        self._raw_config, self._character = _parse_config(self.config_path)
+        self._clear_prompt_cache()
+        return self._character
 
-        except yaml.YAMLError as e:
-            raise ValueError(f"YAML解析エラー: {e}")
-        except Exception as e:
-            raise ValueError(f"キャラクター設定の読み込みに失敗しました: {e}")
+    def _clear_prompt_cache(self) -> None:
+        """キャラクターから生成した文字列のキャッシュを破棄する"""
+        self._system_prompt_cache = None
+        self._personality_cache = None
 
     def get_character(self) -> Character:
         """
@@ -142,74 +287,51 @@ class CharacterManager:
         Returns:
             str: システムプロンプト
         """
+        if self._system_prompt_cache is not None:
+            return self._system_prompt_cache
         char = self.get_character()
 
-        # 基本的なシステムプロンプト
-        prompt_parts = [
-            f"あなたは「{char.name}」という名前のAI botです。",
-            f"",
-            f"【性格・個性】",
-            f"{char.personality}",
-            f"",
-            f"【トーン・話し方】",
-            f"{char.tone}",
-            f"",
-            f"【知識レベル】",
-            f"{char.knowledge_level}",
-            f"",
-            f"【興味・関心分野】",
-        ]
-
-        # 興味分野をリスト化
-        for interest in char.interests:
-            prompt_parts.append(f"- {interest}")
-
-        # スピーキングスタイルの追加
+        # 話し方のスタイル・制約事項は設定がある場合だけ見出しごと差し込む
+        style_block = ""
         if char.speaking_style:
-            prompt_parts.append("")
-            prompt_parts.append("【話し方のスタイル】")
+            style = char.speaking_style
+            style_lines = ["", "", "【話し方のスタイル】"]
 
-            sentence_endings = char.speaking_style.get("sentence_ending", [])
+            sentence_endings = style.get("sentence_ending", [])
             if sentence_endings:
-                prompt_parts.append(
-                    f"- 語尾: {', '.join(sentence_endings)}を使い分ける"
-                )
+                style_lines.append(f"- 語尾: {', '.join(sentence_endings)}を使い分ける")
 
-            emoji_freq = char.speaking_style.get("emoji_frequency", "moderate")
-            max_emoji = char.speaking_style.get("max_emoji_per_tweet", 2)
-            emoji_desc = {
-                "low": "控えめに",
-                "moderate": "適度に",
-                "high": "積極的に",
-            }
-            prompt_parts.append(
-                f"- 絵文字使用: {emoji_desc.get(emoji_freq, '適度に')}（最大{max_emoji}個まで）"
+            emoji_freq = style.get("emoji_frequency", "moderate")
+            max_emoji = style.get("max_emoji_per_tweet", 2)
+            style_lines.append(
+                f"- 絵文字使用: {_EMOJI_FREQUENCY_DESC.get(emoji_freq, '適度に')}（最大{max_emoji}個まで）"
             )
 
-            hashtag_usage = char.speaking_style.get("hashtag_usage", False)
-            if hashtag_usage:
-                prompt_parts.append("- ハッシュタグ: 適切に使用する")
+            if style.get("hashtag_usage", False):
+                style_lines.append("- ハッシュタグ: 適切に使用する")
+            style_block = "\n".join(style_lines)
 
-        # 制約事項の追加
+        constraints_block = ""
         if char.constraints:
-            prompt_parts.append("")
-            prompt_parts.append("【制約事項】")
-
             max_length = char.constraints.get("max_tweet_length", 140)
-            prompt_parts.append(f"- 投稿は{max_length}文字以内に収める")
+            constraint_lines = ["", "", "【制約事項】", f"- 投稿は{max_length}文字以内に収める"]
 
             avoid_topics = char.constraints.get("avoid_topics", [])
             if avoid_topics:
-                prompt_parts.append("- 以下のトピックは避ける:")
-                for topic in avoid_topics:
-                    prompt_parts.append(f"  * {topic}")
-
-        prompt_parts.append("")
-        prompt_parts.append(
-            "これらの設定に従って、魅力的で価値のある投稿を作成してください。"
+                constraint_lines.append("- 以下のトピックは避ける:")
+                constraint_lines.extend(f"  * {topic}" for topic in avoid_topics)
+            constraints_block = "\n".join(constraint_lines)
+
+        self._system_prompt_cache = _SYSTEM_PROMPT_TEMPLATE.format(
+            name=char.name,
+            personality=char.personality,
+            tone=char.tone,
+            knowledge_level=char.knowledge_level,
+            interests="\n".join(f"- {interest}" for interest in char.interests),
+            speaking_style=style_block,
+            constraints=constraints_block,
         )
-
-        return "\n".join(prompt_parts)
+        return self._system_prompt_cache
 
     def get_personality_description(self) -> str:
         """
@@ -218,8 +340,10 @@ class CharacterManager:
         Returns:
             str: 性格の説明
         """
-        char = self.get_character()
-        return f"{char.name}: {char.personality} ({char.tone})"
+        if self._personality_cache is None:
+            char = self.get_character()
+            self._personality_cache = f"{char.name}: {char.personality} ({char.tone})"
+        return self._personality_cache
 
     def update_character(self, updates: Dict[str, Any]) -> None:
         """
@@ -253,6 +377,7 @@ class CharacterManager:
             constraints=current.get("constraints", {}),
         )
 
+        self._clear_prompt_cache()
         logger.info("キャラクター設定を更新しました")
 
     def validate_character_config(self) -> bool:
@@ -434,9 +559,13 @@ class CharacterManager:
             yaml.dump(
                 yaml_data,
                 f,
+                Dumper=_YAMLDumper,
                 allow_unicode=True,
                 default_flow_style=False,
                 sort_keys=False,
             )
 
+        # 書き込んだ内容でキャッシュも更新し、次回の読み込みでYAMLを解析し直さない
+        _write_cache(_cache_path(save_path), save_path.stat(), yaml_data)
+
         logger.info("キャラクター設定を保存しました: %s", save_path)
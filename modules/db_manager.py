@@ -7,14 +7,73 @@ SQLiteデータベースへの接続、テーブル作成、CRUD操作を提供
 
 import logging
 import sqlite3
+import threading
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+# 接続ごとの設定（WALなら synchronous=NORMAL でもコミット済みのデータは壊れない）
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA cache_size=-20000",  # 約20 MB
+)
+
+_UPSERT_TWEET_SQL = """
+    INSERT INTO tweets (
+        tweet_id, content, posted_at, likes, retweets, replies, impressions, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(tweet_id) DO UPDATE SET
+        content = excluded.content,
+        likes = excluded.likes,
+        retweets = excluded.retweets,
+        replies = excluded.replies,
+        impressions = excluded.impressions,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+_INSERT_REPLY_SQL = """
+    INSERT OR IGNORE INTO replies (
+        reply_id, tweet_id, author_id, author_username, content, replied_at
+    ) VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_SNAPSHOT_SQL = """
+    INSERT INTO engagement_snapshots (
+        tweet_id, likes, retweets, replies, impressions
+    ) VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def _tweet_row(t: Dict[str, Any]) -> Tuple:
+    """ツイートデータの辞書を _UPSERT_TWEET_SQL のパラメータに変換する"""
+    return (
+        t['tweet_id'],
+        t['content'],
+        t.get('posted_at'),
+        t.get('likes', 0),
+        t.get('retweets', 0),
+        t.get('replies', 0),
+        t.get('impressions', 0),
+    )
+
+
+def _snapshot_row(s: Dict[str, Any]) -> Tuple:
+    """tweet_id とエンゲージメントデータの辞書を _INSERT_SNAPSHOT_SQL のパラメータに変換する"""
+    return (
+        s['tweet_id'],
+        s.get('likes', 0),
+        s.get('retweets', 0),
+        s.get('replies', 0),
+        s.get('impressions', 0),
+    )
+
+
 class DBManager:
     """SQLiteデータベース操作を管理するクラス"""
 
@@ -25,22 +84,49 @@ class DBManager:
         """
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 接続は1つだけ開いて使い回す（複数スレッドからの利用はロックで直列化する）。
+        # トランザクションは _get_connection で明示的に BEGIN / COMMIT する
+        self._conn: Optional[sqlite3.Connection] = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row  # 辞書形式でアクセス可能にする
+        for pragma in _CONNECTION_PRAGMAS:
+            self._conn.execute(pragma)
+        # WALはDBファイルに記録されるので一度設定すればよい（書き込み中も読み込みがブロックされない）
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
         self._init_db()
 
+    def __enter__(self) -> "DBManager":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
     @contextmanager
     def _get_connection(self):
-        """データベース接続のコンテキストマネージャー"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # 辞書形式でアクセス可能にする
-        try:
-            yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            logger.error(f"Database error: {e}")
-            raise
-        finally:
-            conn.close()
+        """共有接続で1つのトランザクションを実行するコンテキストマネージャー"""
+        with self._lock:
+            conn = self._conn
+            if conn is None:
+                raise RuntimeError("データベース接続は閉じられています")
+            conn.execute("BEGIN")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                logger.error(f"Database error: {e}")
+                raise
 
     def _init_db(self) -> None:
         """データベーステーブルを初期化する"""
@@ -120,29 +206,21 @@ class DBManager:
                 - replies (int): 返信数
                 - impressions (int): インプレッション数 (optional)
         """
+        self.insert_tweets_many([tweet_data])
+
+    def insert_tweets_many(self, tweets: List[Dict[str, Any]]) -> None:
+        """
+        複数のツイートを1トランザクションで挿入または更新する
+
+        Args:
+            tweets: ツイートデータの辞書のリスト（insert_tweet と同じ形式）
+        """
+        if not tweets:
+            return
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO tweets (
-                    tweet_id, content, posted_at, likes, retweets, replies, impressions, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                ON CONFLICT(tweet_id) DO UPDATE SET
-                    content = excluded.content,
-                    likes = excluded.likes,
-                    retweets = excluded.retweets,
-                    replies = excluded.replies,
-                    impressions = excluded.impressions,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (
-                tweet_data['tweet_id'],
-                tweet_data['content'],
-                tweet_data.get('posted_at'),
-                tweet_data.get('likes', 0),
-                tweet_data.get('retweets', 0),
-                tweet_data.get('replies', 0),
-                tweet_data.get('impressions', 0),
-            ))
-            logger.debug(f"Inserted/updated tweet {tweet_data['tweet_id']}")
+            cursor.executemany(_UPSERT_TWEET_SQL, [_tweet_row(t) for t in tweets])
+            logger.debug(f"Inserted/updated {len(tweets)} tweets")
 
     def insert_reply(self, reply_data: Dict[str, Any]) -> None:
         """
@@ -157,21 +235,28 @@ class DBManager:
                 - content (str): 返信本文
                 - replied_at (str/datetime): 返信日時
         """
+        self.insert_replies_many([reply_data])
+
+    def insert_replies_many(self, replies: List[Dict[str, Any]]) -> None:
+        """
+        複数の返信を1トランザクションで挿入する（既存の返信IDは無視する）
+
+        Args:
+            replies: 返信データの辞書のリスト（insert_reply と同じ形式）
+        """
+        if not replies:
+            return
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT OR IGNORE INTO replies (
-                    reply_id, tweet_id, author_id, author_username, content, replied_at
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                reply_data['reply_id'],
-                reply_data['tweet_id'],
-                reply_data['author_id'],
-                reply_data['author_username'],
-                reply_data['content'],
-                reply_data.get('replied_at'),
-            ))
-            logger.debug(f"Inserted reply {reply_data['reply_id']}")
+            cursor.executemany(_INSERT_REPLY_SQL, [(
+                r['reply_id'],
+                r['tweet_id'],
+                r['author_id'],
+                r['author_username'],
+                r['content'],
+                r.get('replied_at'),
+            ) for r in replies])
+            logger.debug(f"Inserted {len(replies)} replies")
 
     def insert_engagement_snapshot(self, tweet_id: str, engagement_data: Dict[str, int]) -> None:
         """
@@ -185,20 +270,36 @@ class DBManager:
                 - replies (int): 返信数
                 - impressions (int): インプレッション数 (optional)
         """
+        self.insert_engagement_snapshots_many([{'tweet_id': tweet_id, **engagement_data}])
+
+    def insert_engagement_snapshots_many(self, snapshots: List[Dict[str, Any]]) -> None:
+        """
+        複数のエンゲージメントスナップショットを1トランザクションで記録する
+
+        Args:
+            snapshots: tweet_id とエンゲージメントデータ（insert_engagement_snapshot と同じキー）を持つ辞書のリスト
+        """
+        if not snapshots:
+            return
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO engagement_snapshots (
-                    tweet_id, likes, retweets, replies, impressions
-                ) VALUES (?, ?, ?, ?, ?)
-            """, (
-                tweet_id,
-                engagement_data.get('likes', 0),
-                engagement_data.get('retweets', 0),
-                engagement_data.get('replies', 0),
-                engagement_data.get('impressions', 0),
-            ))
-            logger.debug(f"Inserted engagement snapshot for tweet {tweet_id}")
+            cursor.executemany(_INSERT_SNAPSHOT_SQL, [_snapshot_row(s) for s in snapshots])
+            logger.debug(f"Inserted {len(snapshots)} engagement snapshots")
+
+    def insert_engagement_batch(self, tweets: List[Dict[str, Any]]) -> None:
+        """
+        複数ツイートの挿入・更新とエンゲージメントスナップショットの記録を1トランザクションで行う
+
+        Args:
+            tweets: ツイートデータの辞書のリスト（insert_tweet と同じ形式）
+        """
+        if not tweets:
+            return
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(_UPSERT_TWEET_SQL, [_tweet_row(t) for t in tweets])
+            cursor.executemany(_INSERT_SNAPSHOT_SQL, [_snapshot_row(t) for t in tweets])
+            logger.debug(f"Inserted engagement snapshots for {len(tweets)} tweets")
 
     def get_tweet(self, tweet_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -216,7 +317,7 @@ class DBManager:
             row = cursor.fetchone()
             return dict(row) if row else None
 
-    def get_recent_tweets(self, limit: int = 100) -> List[Dict[str, Any]]:
+    def get_recent_tweets(self, limit: int = 100) -> List[sqlite3.Row]:
         """
         最近のツイートを取得する
 
@@ -224,7 +325,7 @@ class DBManager:
             limit: 取得する最大件数
 
         Returns:
-            ツイート情報の辞書のリスト
+            ツイート情報の行のリスト（row['likes'] のように列名で参照できる。dict(row) で辞書に変換できる）
         """
         with self._get_connection() as conn:
             cursor = conn.cursor()
@@ -233,9 +334,9 @@ class DBManager:
                 ORDER BY posted_at DESC
                 LIMIT ?
             """, (limit,))
-            return [dict(row) for row in cursor.fetchall()]
+            return cursor.fetchall()
 
-    def get_replies(self, tweet_id: str) -> List[Dict[str, Any]]:
+    def get_replies(self, tweet_id: str) -> List[sqlite3.Row]:
         """
         特定のツイートへの返信を取得する
 
@@ -243,7 +344,7 @@ class DBManager:
             tweet_id: ツイートID
 
         Returns:
-            返信情報の辞書のリスト
+            返信情報の行のリスト（列名で参照できる）
         """
         with self._get_connection() as conn:
             cursor = conn.cursor()
@@ -252,9 +353,9 @@ class DBManager:
                 WHERE tweet_id = ?
                 ORDER BY replied_at DESC
             """, (tweet_id,))
-            return [dict(row) for row in cursor.fetchall()]
+            return cursor.fetchall()
 
-    def get_engagement_history(self, tweet_id: str) -> List[Dict[str, Any]]:
+    def get_engagement_history(self, tweet_id: str) -> List[sqlite3.Row]:
         """
         ツイートのエンゲージメント履歴を取得する
 
@@ -262,7 +363,7 @@ class DBManager:
             tweet_id: ツイートID
 
         Returns:
-            エンゲージメントスナップショットのリスト
+            エンゲージメントスナップショットの行のリスト（列名で参照できる）
         """
         with self._get_connection() as conn:
             cursor = conn.cursor()
@@ -271,9 +372,9 @@ class DBManager:
                 WHERE tweet_id = ?
                 ORDER BY snapshot_at ASC
             """, (tweet_id,))
-            return [dict(row) for row in cursor.fetchall()]
+            return cursor.fetchall()
 
-    def get_tweets_without_recent_snapshot(self, hours: int = 24) -> List[Dict[str, Any]]:
+    def get_tweets_without_recent_snapshot(self, hours: int = 24) -> List[sqlite3.Row]:
         """
         最近スナップショットが取得されていないツイートを取得する
 
@@ -281,22 +382,24 @@ class DBManager:
             hours: 何時間以内のスナップショットがあればスキップするか
 
         Returns:
-            ツイート情報の辞書のリスト
+            ツイート情報の行のリスト（row['likes'] のように列名で参照できる。dict(row) で辞書に変換できる）
         """
+        # snapshot_at は CURRENT_TIMESTAMP（UTCの 'YYYY-MM-DD HH:MM:SS'）なので、同じ形式の境界時刻と
+        # 文字列のまま比較できる（datetime() で包まないので索引で範囲検索できる）
+        cutoff = (datetime.now(timezone.utc) - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
         with self._get_connection() as conn:
             cursor = conn.cursor()
+            # ツイートごとに idx_snapshots_tweet_id で境界以降のスナップショットの有無だけを調べる
+            # （スナップショット全体を集計しない）
             cursor.execute("""
                 SELECT t.* FROM tweets t
-                LEFT JOIN (
-                    SELECT tweet_id, MAX(snapshot_at) as last_snapshot
-                    FROM engagement_snapshots
-                    GROUP BY tweet_id
-                ) s ON t.tweet_id = s.tweet_id
-                WHERE s.last_snapshot IS NULL
-                   OR datetime(s.last_snapshot) < datetime('now', '-' || ? || ' hours')
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM engagement_snapshots s
+                    WHERE s.tweet_id = t.tweet_id AND s.snapshot_at >= ?
+                )
                 ORDER BY t.posted_at DESC
-            """, (hours,))
-            return [dict(row) for row in cursor.fetchall()]
+            """, (cutoff,))
+            return cursor.fetchall()
 
     def get_statistics(self) -> Dict[str, Any]:
         """
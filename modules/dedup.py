@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+重複検出モジュール
+
+過去の投稿との類似度を文字bigramのJaccard係数とSimHashで判定する。
+MinHash LSH で候補を絞り込み、候補に対してのみ厳密な類似度を計算する。
+"""
+
+import string
+import struct
+from collections import Counter
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from datasketch import LeanMinHash, MinHash, MinHashLSH
+
+# ====== しきい値 ======
+# Jaccard >= JACCARD_TH または Hamming <= HAMMING_TH なら重複とみなす
+JACCARD_TH = 0.80
+HAMMING_TH = 3
+
+# ====== MinHash 設定 ======
+NUM_PERM = 128
+MINHASH_SCHEME = "affine32"
+
+# ====== 永続化フォーマット ======
+# SimHashの計算方法を変えたら上げる（保存済みのSimHashを再計算させる）
+INDEX_VERSION = 2
+
+# レコード = <正規化テキスト長:u32><SimHash:u64> + 正規化テキスト(UTF-8) + MinHash値(u32 x NUM_PERM)
+_RECORD_HEAD = struct.Struct("<IQ")
+_MINHASH_BYTES = NUM_PERM * 4
+
+# バイト値 -> 立っているビット数 の参照表
+_POPCNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+_HAS_BITWISE_COUNT = hasattr(np, "bitwise_count")
+
+_PUNCT_TABLE = str.maketrans(
+    {c: " " for c in (string.punctuation + "’“”‘「」『』（）()[]{}")}
+)
+
+
+def normalize(text: str) -> str:
+    """
+    テキストを正規化（小文字化、句読点削除、空白正規化）
+
+    連続する空白は str.split() / join で1つにまとめる（正規表現を使わない）。
+    保存済みの正規化テキストと一致させるため、句読点由来の先頭・末尾の空白は1つ残す。
+    """
+    if not text:
+        return ""
+    t = text.strip().lower().translate(_PUNCT_TABLE)
+    body = " ".join(t.split())
+    if not body:
+        return " " if t else ""
+    if t[0].isspace():
+        body = " " + body
+    if t[-1].isspace():
+        body += " "
+    return body
+
+
+def char_ngrams(s: str, n: int = 2) -> FrozenSet[str]:
+    """文字列からn-gramセットを生成（キャッシュで共有できるよう不変集合で返す）"""
+    if " " in s:
+        s = s.replace(" ", "")
+    if len(s) < n:
+        return frozenset((s,)) if s else frozenset()
+    return frozenset([s[i : i + n] for i in range(len(s) - n + 1)])
+
+
+# 1文字あたりのビット幅（Unicodeコードポイントは21bitに収まる）
+_CODEPOINT_BITS = 21
+
+
+def char_ngram_codes(s: str, n: int = 2) -> FrozenSet[int]:
+    """
+    文字列からn-gramを整数コードの集合として生成する
+
+    各n-gramはコードポイントを21bitずつ詰めた整数になる（n <= 3）。
+    文字列スライスを作らないため、Jaccard計算用の集合を安価に作れる。
+    """
+    s = s.replace(" ", "")
+    if not s:
+        return frozenset()
+    cps = np.frombuffer(s.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    n = min(n, len(cps))  # 短い文字列は全体を1つのn-gramとする
+    width = len(cps) - n + 1
+    codes = cps[:width].copy()
+    for k in range(1, n):
+        codes = (codes << np.uint64(_CODEPOINT_BITS)) | cps[k : k + width]
+    return frozenset(codes.tolist())
+
+
+def jaccard(a: set, b: set) -> float:
+    """
+    2つの集合のJaccard係数を計算
+
+    和集合は作らず、|A∪B| = |A| + |B| - |A∩B| から求める。
+    """
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    if inter == 0:
+        return 0.0
+    return inter / (len(a) + len(b) - inter)
+
+
+def jaccard_at_least(a: set, b: set, threshold: float) -> float:
+    """
+    Jaccard係数がthreshold以上になり得る場合のみ計算する
+
+    |A∩B| / |A∪B| <= min(|A|,|B|) / max(|A|,|B|) なので、
+    集合サイズの比がthreshold未満なら積集合を取らずに0.0を返す。
+    """
+    la, lb = len(a), len(b)
+    if min(la, lb) < threshold * max(la, lb):
+        return 0.0
+    return jaccard(a, b)
+
+
+def _simhash_core(hashes: np.ndarray, weights: Optional[np.ndarray] = None) -> int:
+    """
+    トークンハッシュ配列と重みからSimHashを計算する
+
+    np.unpackbits で (トークン数, 64) のビット行列に展開し、
+    各ビット位置の符号付き重み和 Σw(2b-1) = 2Σwb - Σw を行列ベクトル積1回で求める。
+
+    Args:
+        hashes: 各トークンの64bitハッシュ（uint64配列）
+        weights: 各トークンの出現回数（int64配列）。None なら全て1として列和を取る
+    """
+    octets = hashes.astype("<u8", copy=False).view(np.uint8)
+    bits = np.unpackbits(octets, bitorder="little").reshape(-1, 64)
+    if weights is None:
+        v = 2 * bits.sum(axis=0, dtype=np.int64) - len(bits)
+    else:
+        v = 2 * (weights @ bits) - weights.sum()
+    packed = np.packbits(v >= 0, bitorder="little")
+    return int.from_bytes(packed.tobytes(), "little")
+
+
+def token_hash(tok: str) -> bytes:
+    """
+    トークンの64bitハッシュ（リトルエンディアン8バイト）
+
+    組み込みの hash() はプロセスごとにランダム化されるため、
+    保存したSimHashを次回以降の実行でも比較できるよう BLAKE2b を使う。
+    """
+    return blake2b(tok.encode("utf-8"), digest_size=8).digest()
+
+
+def simhash(tokens: Iterable[str]) -> int:
+    """トークンリストからSimHashを計算"""
+    if isinstance(tokens, (set, frozenset)):
+        # 集合なら重みは全て1なので Counter を作らない
+        hashes = np.frombuffer(b"".join(map(token_hash, tokens)), dtype="<u8")
+        return _simhash_core(hashes)
+    cnt = Counter(tokens)
+    hashes = np.frombuffer(b"".join(map(token_hash, cnt)), dtype="<u8")
+    weights = np.fromiter(cnt.values(), dtype=np.int64, count=len(cnt))
+    return _simhash_core(hashes, weights)
+
+
+def hamming(a: int, b: int) -> int:
+    """2つの整数のハミング距離を計算"""
+    return (a ^ b).bit_count()
+
+
+def hamming_many(simhashes: np.ndarray, sh: int) -> np.ndarray:
+    """
+    SimHash配列の各要素とのハミング距離をまとめて計算
+
+    NumPy 2.0 以降は popcount 命令を使う np.bitwise_count で数え、
+    それ以前はバイト単位の参照表で数える。
+    """
+    xor = np.bitwise_xor(simhashes, np.uint64(sh))
+    if _HAS_BITWISE_COUNT:
+        return np.bitwise_count(xor)
+    return _POPCNT[xor.view(np.uint8).reshape(-1, 8)].sum(axis=1, dtype=np.int64)
+
+
+def minhash(grams: Iterable[str]) -> MinHash:
+    """n-gramセットからMinHashを計算"""
+    mh = MinHash(num_perm=NUM_PERM, scheme=MINHASH_SCHEME)
+    mh.update_batch([g.encode("utf-8") for g in grams])
+    return mh
+
+
+@lru_cache(maxsize=16)
+def text_features(norm: str) -> Tuple[FrozenSet[int], int, LeanMinHash]:
+    """
+    正規化済みテキストから重複判定に使う特徴量をまとめて計算する
+
+    生成のリトライで同じ（または同一に正規化される）テキストが返ることがあるため、
+    直近の結果をキャッシュする。戻り値は変更されない前提で共有される。
+
+    Args:
+        norm: normalize() 済みのテキスト
+
+    Returns:
+        (bigramの整数コード集合, SimHash, MinHash)
+    """
+    grams = char_ngrams(norm, 2)
+    return char_ngram_codes(norm, 2), simhash(grams), LeanMinHash(minhash(grams))
+
+
+def make_entry(norm: str) -> Dict:
+    """
+    正規化済みテキストからインデックスのエントリを作成する
+
+    プロセスプールからも呼べるよう、モジュールレベルの関数にしている。
+    """
+    _, sh, mh = text_features(norm)
+    return {"norm": norm, "simhash": sh, "minhash": mh.hashvalues.tolist()}
+
+
+def pack_entry(item: Dict) -> bytes:
+    """インデックスのエントリを長さ付きバイナリレコードに変換"""
+    norm = item["norm"].encode("utf-8")
+    mh = np.asarray(item["minhash"], dtype="<u4").tobytes()
+    return _RECORD_HEAD.pack(len(norm), int(item["simhash"])) + norm + mh
+
+
+def unpack_entries(data: bytes) -> Iterator[Dict]:
+    """
+    バイナリレコード列からエントリを復元する
+
+    Raises:
+        ValueError: 末尾のレコードが途中で切れている場合
+    """
+    offset = 0
+    while offset < len(data):
+        if offset + _RECORD_HEAD.size > len(data):
+            raise ValueError("インデックスのレコードが途中で切れています")
+        norm_len, sh = _RECORD_HEAD.unpack_from(data, offset)
+        offset += _RECORD_HEAD.size
+        end = offset + norm_len + _MINHASH_BYTES
+        if end > len(data):
+            raise ValueError("インデックスのレコードが途中で切れています")
+        norm = data[offset : offset + norm_len].decode("utf-8")
+        mh = np.frombuffer(data, dtype="<u4", count=NUM_PERM, offset=offset + norm_len)
+        offset = end
+        yield {"norm": norm, "simhash": sh, "minhash": mh.tolist()}
+
+
+class DedupIndex:
+    """
+    過去投稿の重複検出インデックス
+
+    各エントリは {"norm": 正規化テキスト, "simhash": SimHash, "minhash": MinHash値}
+    の辞書で、MinHash値から LSH を再構築して候補検索に使う。
+    bigram集合（整数コード）はファイルに保存せず、初めて比較対象になった時に計算して
+    メモリ上に保持する（ロード時に全件をトークン化しない）。
+    """
+
+    def __init__(self, items: Optional[Iterable[Dict]] = None):
+        """
+        Args:
+            items: 永続化済みのエントリ（minhash が無い旧形式も可）
+        """
+        self.items: List[Dict] = []
+        self._grams: List[Optional[FrozenSet[int]]] = []
+        # SimHash配列の領域（容量は倍々で確保し、先頭 len(items) 件が有効）
+        self._sh_buf: Optional[np.ndarray] = None
+        self._lsh = MinHashLSH(threshold=JACCARD_TH, num_perm=NUM_PERM)
+        for item in items or []:
+            self._insert(item)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.items)
+
+    def add(self, norm: str) -> Dict:
+        """
+        正規化済みテキストをインデックスに追加する
+
+        Args:
+            norm: normalize() 済みのテキスト
+
+        Returns:
+            追加したエントリ
+        """
+        item = make_entry(norm)
+        self._insert(item)
+        return item
+
+    def _insert(self, item: Dict) -> None:
+        """エントリを追加し、LSHに登録する"""
+        if "minhash" not in item:
+            item["minhash"] = minhash(char_ngrams(item["norm"], 2)).hashvalues.tolist()
+        mh = LeanMinHash(
+            seed=1, hashvalues=item["minhash"], scheme=MINHASH_SCHEME
+        )
+        self._lsh.insert(len(self.items), mh, check_duplication=False)
+        self.items.append(item)
+        self._grams.append(None)
+        if self._sh_buf is not None:
+            # 構築済みの配列は作り直さず末尾に書き込む（常駐モードでの追加時）
+            n = len(self.items) - 1
+            if n >= len(self._sh_buf):
+                grown = np.empty(max(1, 2 * len(self._sh_buf)), dtype=np.uint64)
+                grown[:n] = self._sh_buf[:n]
+                self._sh_buf = grown
+            self._sh_buf[n] = np.uint64(item["simhash"])
+
+    def _item_grams(self, i: int) -> FrozenSet[int]:
+        """i番目のエントリのbigram集合を返す（初回アクセス時に計算してキャッシュ）"""
+        grams = self._grams[i]
+        if grams is None:
+            grams = self._grams[i] = char_ngram_codes(self.items[i]["norm"], 2)
+        return grams
+
+    def refresh_simhashes(self) -> None:
+        """保存済みのSimHashを現在のハッシュ関数で計算し直す"""
+        for item in self.items:
+            item["simhash"] = simhash(char_ngrams(item["norm"], 2))
+        self._sh_buf = None
+
+    def _simhash_array(self) -> np.ndarray:
+        """全エントリのSimHashをuint64配列として返す（初回呼び出し時に構築）"""
+        if self._sh_buf is None:
+            self._sh_buf = np.fromiter(
+                (int(item["simhash"]) for item in self.items),
+                dtype=np.uint64,
+                count=len(self.items),
+            )
+        return self._sh_buf[: len(self.items)]
+
+    def most_similar(self, candidate: str) -> Tuple[float, int, Optional[Dict]]:
+        """
+        候補テキストと最も類似する過去の投稿を見つける
+
+        LSH のバケットに入った候補と、SimHash が近いエントリだけを厳密に比較する。
+
+        Returns:
+            (Jaccard係数, ハミング距離, 最も類似するエントリ)
+        """
+        codes, sh, mh = text_features(normalize(candidate))
+
+        hams = hamming_many(self._simhash_array(), sh)
+        keys = set(self._lsh.query(mh))
+        keys.update(np.flatnonzero(hams <= HAMMING_TH).tolist())
+
+        best = (0.0, 64, None)
+        # SimHashが近い順に比較し、早い段階で最良値を引き上げて枝刈りを効かせる
+        for i in sorted(keys, key=lambda k: (hams[k], k)):
+            if best[0] == 1.0:
+                break  # 以降はハミング距離も縮まらないので更新され得ない
+            # 現在の最良値を超えられないエントリは積集合を計算しない
+            jac = jaccard_at_least(codes, self._item_grams(i), best[0])
+            ham = int(hams[i])
+            if jac > best[0] or (jac == best[0] and ham < best[1]):
+                best = (jac, ham, self.items[i])
+        return best
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+埋め込みベクトルのディスクキャッシュ
+
+同じテキストを何度も埋め込まないよう、SQLiteにfloat32のバイト列として保存する。
+キーは (provider, model, text) のSHA-256なので、モデルを切り替えても古いベクトルは返らない。
+"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """SQLiteに永続化する埋め込みキャッシュ"""
+
+    def __init__(self, db_path: str, model: str, provider: str = "sentence-transformers"):
+        """
+        Args:
+            db_path: キャッシュDBファイルのパス
+            model: 埋め込みモデル名
+            provider: 埋め込みの提供元（モデル名と合わせてキーに含める）
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.provider = provider
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, vec BLOB NOT NULL, created_at INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def key(self, text: str) -> str:
+        """テキストに対応するキャッシュキーを返す"""
+        return hashlib.sha256(f"{self.provider}:{self.model}:{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """
+        キャッシュ済みのベクトルを取得する
+
+        Returns:
+            float32のベクトル（未登録の場合はNone）
+        """
+        row = self._conn.execute(
+            "SELECT vec FROM cache WHERE key = ?", (self.key(text),)
+        ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def put(self, text: str, vec) -> None:
+        """ベクトルをfloat32に変換して保存する"""
+        blob = np.asarray(vec, dtype=np.float32).tobytes()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache (key, vec, created_at) VALUES (?, ?, ?)",
+            (self.key(text), blob, int(time.time())),
+        )
+        self._conn.commit()
+
+    def embed_with_cache(self, text: str, embed: Callable[[str], object]) -> np.ndarray:
+        """
+        キャッシュにあれば返し、無ければ embed(text) で計算して保存する
+
+        Args:
+            text: 埋め込むテキスト
+            embed: キャッシュミス時に呼ぶ埋め込み関数
+
+        Returns:
+            float32のベクトル
+        """
+        vec = self.get(text)
+        if vec is None:
+            vec = np.asarray(embed(text), dtype=np.float32)
+            self.put(text, vec)
+        return vec
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self) -> None:
+        """DB接続を閉じる"""
+        self._conn.close()
@@ -5,8 +5,10 @@ Twitter Feedback Collector
 Twitter API v2を使用して、自分の過去ツイートのエンゲージメントデータを収集する
 """
 
+import asyncio
 import logging
 import os
+import sqlite3
 import time
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Any
@@ -21,6 +23,9 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# GET /2/tweets で1回に指定できるIDの上限
+MAX_IDS_PER_LOOKUP = 100
+
 
 class FeedbackCollector:
     """Twitter API v2を使用してエンゲージメントデータを収集するクラス"""
@@ -51,18 +56,21 @@ class FeedbackCollector:
         has_oauth = all([api_key, api_secret, access_token, access_token_secret])
 
         # クライアントの初期化
+        # 認証情報は AsyncFeedbackCollector が同じ設定で非同期クライアントを作れるよう保持する
         if has_oauth:
             # OAuth 1.0aを使用（ユーザーコンテキストあり、get_me()が使える）
-            self.client = tweepy.Client(
-                consumer_key=api_key,
-                consumer_secret=api_secret,
-                access_token=access_token,
-                access_token_secret=access_token_secret,
-            )
+            self._client_kwargs = {
+                'consumer_key': api_key,
+                'consumer_secret': api_secret,
+                'access_token': access_token,
+                'access_token_secret': access_token_secret,
+            }
+            self.client = tweepy.Client(**self._client_kwargs)
             logger.info("Initialized Twitter API v2 client with OAuth 1.0a")
         elif bearer_token:
             # Bearer Tokenのみ（アプリのみ認証、get_me()は使えない）
-            self.client = tweepy.Client(bearer_token=bearer_token)
+            self._client_kwargs = {'bearer_token': bearer_token}
+            self.client = tweepy.Client(**self._client_kwargs)
             logger.info("Initialized Twitter API v2 client with Bearer Token")
         else:
             raise ValueError(
@@ -164,21 +172,10 @@ class FeedbackCollector:
                 logger.info(f"No tweets found in the last {days} days")
                 return []
 
-            tweets = []
-            for tweet in response.data:
-                tweet_data = {
-                    'tweet_id': str(tweet.id),
-                    'content': tweet.text,
-                    'posted_at': tweet.created_at.isoformat() if tweet.created_at else None,
-                    'likes': tweet.public_metrics.get('like_count', 0) if tweet.public_metrics else 0,
-                    'retweets': tweet.public_metrics.get('retweet_count', 0) if tweet.public_metrics else 0,
-                    'replies': tweet.public_metrics.get('reply_count', 0) if tweet.public_metrics else 0,
-                    'impressions': tweet.public_metrics.get('impression_count', 0) if tweet.public_metrics else 0,
-                }
-                tweets.append(tweet_data)
-
-                # データベースに保存
-                self.db.insert_tweet(tweet_data)
+            tweets = [self._tweet_to_dict(tweet) for tweet in response.data]
+
+            # データベースに1トランザクションでまとめて保存
+            self.db.insert_tweets_many(tweets)
 
             logger.info(f"Collected {len(tweets)} tweets from the last {days} days")
             return tweets
@@ -209,29 +206,7 @@ class FeedbackCollector:
                 logger.warning(f"Tweet {tweet_id} not found")
                 return {}
 
-            tweet = response.data
-            tweet_data = {
-                'tweet_id': str(tweet.id),
-                'content': tweet.text,
-                'posted_at': tweet.created_at.isoformat() if tweet.created_at else None,
-                'likes': tweet.public_metrics.get('like_count', 0) if tweet.public_metrics else 0,
-                'retweets': tweet.public_metrics.get('retweet_count', 0) if tweet.public_metrics else 0,
-                'replies': tweet.public_metrics.get('reply_count', 0) if tweet.public_metrics else 0,
-                'impressions': tweet.public_metrics.get('impression_count', 0) if tweet.public_metrics else 0,
-            }
-
-            # データベースに保存
-            self.db.insert_tweet(tweet_data)
-
-            # エンゲージメントスナップショットを記録
-            engagement_data = {
-                'likes': tweet_data['likes'],
-                'retweets': tweet_data['retweets'],
-                'replies': tweet_data['replies'],
-                'impressions': tweet_data['impressions'],
-            }
-            self.db.insert_engagement_snapshot(tweet_id, engagement_data)
-
+            tweet_data = self._save_engagement(response.data)
             logger.info(f"Collected engagement for tweet {tweet_id}")
             return tweet_data
 
@@ -239,6 +214,51 @@ class FeedbackCollector:
             logger.error(f"Error collecting engagement for tweet {tweet_id}: {e}")
             raise
 
+    def collect_tweet_engagement_batch(self, tweet_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        複数ツイートのエンゲージメント情報を1リクエストで収集する
+
+        GET /2/tweets は1回で最大100件のIDを受け付けるため、100件ずつまとめて取得する。
+
+        Args:
+            tweet_ids: ツイートIDのリスト
+
+        Returns:
+            エンゲージメント情報の辞書のリスト（取得できたツイートのみ）
+        """
+        collected = []
+        for start in range(0, len(tweet_ids), MAX_IDS_PER_LOOKUP):
+            chunk = tweet_ids[start:start + MAX_IDS_PER_LOOKUP]
+            try:
+                response = self._handle_rate_limit(
+                    self.client.get_tweets,
+                    ids=chunk,
+                    tweet_fields=['created_at', 'public_metrics', 'text']
+                )
+                collected.extend(self._save_engagement_batch(chunk, response))
+            except Exception as e:
+                logger.error(f"Error collecting engagement for {len(chunk)} tweets: {e}")
+                raise
+        return collected
+
+    def _save_engagement_batch(self, tweet_ids: List[str], response) -> List[Dict[str, Any]]:
+        """
+        get_tweets のレスポンスを保存し、スナップショットをまとめて記録する
+
+        Args:
+            tweet_ids: 要求したツイートIDのリスト
+            response: get_tweets のレスポンス
+
+        Returns:
+            ツイート情報の辞書のリスト
+        """
+        tweets = [self._tweet_to_dict(t) for t in (response.data or [])] if response else []
+        self.db.insert_engagement_batch(tweets)
+        if len(tweets) < len(tweet_ids):
+            logger.warning(f"{len(tweet_ids) - len(tweets)} tweets not found")
+        logger.info(f"Collected engagement for {len(tweets)} tweets")
+        return tweets
+
     def collect_replies(self, tweet_id: str, max_results: int = 10) -> List[Dict[str, Any]]:
         """
         特定のツイートへの返信を収集する
@@ -264,44 +284,109 @@ class FeedbackCollector:
                 max_results=min(max_results, 100)
             )
 
-            if not response or not response.data:
-                logger.info(f"No replies found for tweet {tweet_id}")
-                return []
-
-            # ユーザー情報をマッピング
-            users = {}
-            if response.includes and 'users' in response.includes:
-                for user in response.includes['users']:
-                    users[user.id] = user.username
-
-            replies = []
-            for reply in response.data:
-                reply_data = {
-                    'reply_id': str(reply.id),
-                    'tweet_id': tweet_id,
-                    'author_id': str(reply.author_id),
-                    'author_username': users.get(reply.author_id, 'unknown'),
-                    'content': reply.text,
-                    'replied_at': reply.created_at.isoformat() if reply.created_at else None,
-                }
-                replies.append(reply_data)
-
-                # データベースに保存
-                self.db.insert_reply(reply_data)
-
-            logger.info(f"Collected {len(replies)} replies for tweet {tweet_id}")
-            return replies
+            return self._save_replies(tweet_id, response)
 
         except Exception as e:
-            logger.error(f"Error collecting replies for tweet {tweet_id}: {e}")
-            # 検索APIが使えない場合（Free tierの制限など）はエラーをログに記録して空リストを返す
-            if "403" in str(e) or "Forbidden" in str(e):
-                logger.warning(
-                    f"Search API not available (likely Free tier limitation). "
-                    f"Cannot collect replies for tweet {tweet_id}"
-                )
-                return []
-            raise
+            return self._handle_replies_error(tweet_id, e)
+
+    @staticmethod
+    def _tweet_to_dict(tweet) -> Dict[str, Any]:
+        """
+        APIのツイートオブジェクトを保存用の辞書に変換する
+
+        Args:
+            tweet: tweepy.Tweet
+
+        Returns:
+            ツイート情報の辞書
+        """
+        metrics = tweet.public_metrics or {}
+        return {
+            'tweet_id': str(tweet.id),
+            'content': tweet.text,
+            'posted_at': tweet.created_at.isoformat() if tweet.created_at else None,
+            'likes': metrics.get('like_count', 0),
+            'retweets': metrics.get('retweet_count', 0),
+            'replies': metrics.get('reply_count', 0),
+            'impressions': metrics.get('impression_count', 0),
+        }
+
+    def _save_engagement(self, tweet) -> Dict[str, Any]:
+        """
+        ツイートを保存し、エンゲージメントスナップショットを記録する
+
+        Args:
+            tweet: tweepy.Tweet
+
+        Returns:
+            ツイート情報の辞書
+        """
+        tweet_data = self._tweet_to_dict(tweet)
+
+        # データベースに保存
+        self.db.insert_tweet(tweet_data)
+
+        # エンゲージメントスナップショットを記録
+        engagement_data = {
+            'likes': tweet_data['likes'],
+            'retweets': tweet_data['retweets'],
+            'replies': tweet_data['replies'],
+            'impressions': tweet_data['impressions'],
+        }
+        self.db.insert_engagement_snapshot(tweet_data['tweet_id'], engagement_data)
+        return tweet_data
+
+    def _save_replies(self, tweet_id: str, response) -> List[Dict[str, Any]]:
+        """
+        返信検索のレスポンスを保存する
+
+        Args:
+            tweet_id: 元ツイートID
+            response: search_recent_tweets のレスポンス
+
+        Returns:
+            返信情報の辞書のリスト
+        """
+        if not response or not response.data:
+            logger.info(f"No replies found for tweet {tweet_id}")
+            return []
+
+        # ユーザー情報をマッピング
+        users = {}
+        if response.includes and 'users' in response.includes:
+            for user in response.includes['users']:
+                users[user.id] = user.username
+
+        replies = []
+        for reply in response.data:
+            reply_data = {
+                'reply_id': str(reply.id),
+                'tweet_id': tweet_id,
+                'author_id': str(reply.author_id),
+                'author_username': users.get(reply.author_id, 'unknown'),
+                'content': reply.text,
+                'replied_at': reply.created_at.isoformat() if reply.created_at else None,
+            }
+            replies.append(reply_data)
+
+        # データベースに1トランザクションでまとめて保存
+        self.db.insert_replies_many(replies)
+
+        logger.info(f"Collected {len(replies)} replies for tweet {tweet_id}")
+        return replies
+
+    @staticmethod
+    def _handle_replies_error(tweet_id: str, e: Exception) -> List[Dict[str, Any]]:
+        """返信収集のエラーを処理する（検索APIが使えない場合は空リストを返す）"""
+        logger.error(f"Error collecting replies for tweet {tweet_id}: {e}")
+        # 検索APIが使えない場合（Free tierの制限など）はエラーをログに記録して空リストを返す
+        if "403" in str(e) or "Forbidden" in str(e):
+            logger.warning(
+                f"Search API not available (likely Free tier limitation). "
+                f"Cannot collect replies for tweet {tweet_id}"
+            )
+            return []
+        raise e
 
     def save_to_db(self, data: Dict[str, Any]) -> None:
         """
@@ -317,7 +402,7 @@ class FeedbackCollector:
         else:
             logger.warning("Unknown data format. Cannot save to database.")
 
-    def get_engagement_history(self, tweet_id: str) -> List[Dict[str, Any]]:
+    def get_engagement_history(self, tweet_id: str) -> List[sqlite3.Row]:
         """
         ツイートのエンゲージメント履歴を取得する
 
@@ -325,7 +410,7 @@ class FeedbackCollector:
             tweet_id: ツイートID
 
         Returns:
-            エンゲージメントスナップショットのリスト
+            エンゲージメントスナップショットの行のリスト（列名で参照できる）
         """
         return self.db.get_engagement_history(tweet_id)
 
@@ -345,15 +430,15 @@ class FeedbackCollector:
             logger.info("No tweets to update")
             return 0
 
+        # 100件ずつまとめて取得する（ツイートごとのリクエストと待機を行わない）
+        tweet_ids = [tweet['tweet_id'] for tweet in tweets]
         updated_count = 0
-        for tweet in tweets:
+        for start in range(0, len(tweet_ids), MAX_IDS_PER_LOOKUP):
+            chunk = tweet_ids[start:start + MAX_IDS_PER_LOOKUP]
             try:
-                self.collect_tweet_engagement(tweet['tweet_id'])
-                updated_count += 1
-                # レート制限を考慮して少し待機
-                time.sleep(1)
+                updated_count += len(self.collect_tweet_engagement_batch(chunk))
             except Exception as e:
-                logger.error(f"Failed to update tweet {tweet['tweet_id']}: {e}")
+                logger.error(f"Failed to update {len(chunk)} tweets: {e}")
                 continue
 
         logger.info(f"Updated engagement for {updated_count}/{len(tweets)} tweets")
@@ -367,3 +452,136 @@ class FeedbackCollector:
             統計情報の辞書
         """
         return self.db.get_statistics()
+
+
+class AsyncFeedbackCollector:
+    """
+    tweepy の AsyncClient を使って、ツイートごとの収集を並行実行するためのラッパー
+
+    認証情報とデータベースは FeedbackCollector のものを共有する。
+    ツイートごとのエンゲージメント・返信の収集を await できるため、
+    asyncio.gather で複数ツイートのHTTP往復を重ねられる（tweepy[async] が必要）。
+    """
+
+    def __init__(self, collector: FeedbackCollector):
+        """
+        Args:
+            collector: 初期化済みの FeedbackCollector
+        """
+        from tweepy.asynchronous import AsyncClient
+
+        self.collector = collector
+        self.client = AsyncClient(**collector._client_kwargs)
+
+    async def _handle_rate_limit(self, func, *args, max_retries: int = 3, **kwargs):
+        """
+        レート制限を処理してコルーチン関数を実行する（待機中は他のリクエストを進める）
+
+        Args:
+            func: 実行するコルーチン関数
+            max_retries: 最大リトライ回数
+            *args, **kwargs: 関数に渡す引数
+
+        Returns:
+            関数の実行結果
+        """
+        for attempt in range(max_retries):
+            try:
+                return await func(*args, **kwargs)
+            except tweepy.TooManyRequests:
+                if attempt < max_retries - 1:
+                    wait_time = 60 * (attempt + 1)  # 1分、2分、3分...
+                    logger.warning(
+                        f"Rate limit exceeded. Waiting {wait_time} seconds... (attempt {attempt + 1}/{max_retries})"
+                    )
+                    await asyncio.sleep(wait_time)
+                else:
+                    logger.error("Rate limit exceeded. Max retries reached.")
+                    raise
+            except tweepy.errors.TwitterServerError:
+                if attempt < max_retries - 1:
+                    wait_time = 5 * (attempt + 1)
+                    logger.warning(f"Twitter server error. Retrying in {wait_time} seconds...")
+                    await asyncio.sleep(wait_time)
+                else:
+                    raise
+        return None
+
+    async def collect_tweet_engagement(self, tweet_id: str) -> Dict[str, Any]:
+        """
+        特定のツイートのエンゲージメント情報を収集する
+
+        Args:
+            tweet_id: ツイートID
+
+        Returns:
+            エンゲージメント情報の辞書
+        """
+        try:
+            response = await self._handle_rate_limit(
+                self.client.get_tweet,
+                id=tweet_id,
+                tweet_fields=['created_at', 'public_metrics', 'text']
+            )
+
+            if not response or not response.data:
+                logger.warning(f"Tweet {tweet_id} not found")
+                return {}
+
+            tweet_data = self.collector._save_engagement(response.data)
+            logger.info(f"Collected engagement for tweet {tweet_id}")
+            return tweet_data
+
+        except Exception as e:
+            logger.error(f"Error collecting engagement for tweet {tweet_id}: {e}")
+            raise
+
+    async def collect_tweet_engagement_batch(self, tweet_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        複数ツイートのエンゲージメント情報を100件ずつまとめて収集する
+
+        Args:
+            tweet_ids: ツイートIDのリスト
+
+        Returns:
+            エンゲージメント情報の辞書のリスト（取得できたツイートのみ）
+        """
+        collected = []
+        for start in range(0, len(tweet_ids), MAX_IDS_PER_LOOKUP):
+            chunk = tweet_ids[start:start + MAX_IDS_PER_LOOKUP]
+            try:
+                response = await self._handle_rate_limit(
+                    self.client.get_tweets,
+                    ids=chunk,
+                    tweet_fields=['created_at', 'public_metrics', 'text']
+                )
+                collected.extend(self.collector._save_engagement_batch(chunk, response))
+            except Exception as e:
+                logger.error(f"Error collecting engagement for {len(chunk)} tweets: {e}")
+                raise
+        return collected
+
+    async def collect_replies(self, tweet_id: str, max_results: int = 10) -> List[Dict[str, Any]]:
+        """
+        特定のツイートへの返信を収集する
+
+        Args:
+            tweet_id: ツイートID
+            max_results: 取得する最大件数（1-100）
+
+        Returns:
+            返信情報の辞書のリスト
+        """
+        try:
+            response = await self._handle_rate_limit(
+                self.client.search_recent_tweets,
+                query=f"conversation_id:{tweet_id} is:reply",
+                tweet_fields=['created_at', 'author_id', 'text', 'conversation_id'],
+                expansions=['author_id'],
+                user_fields=['username'],
+                max_results=min(max_results, 100)
+            )
+            return self.collector._save_replies(tweet_id, response)
+
+        except Exception as e:
+            return self.collector._handle_replies_error(tweet_id, e)
@@ -3,51 +3,167 @@ Knowledge Base (RAG) Module
 
 ChromaDBを使用したベクトルデータベースによるRAGシステム。
 過去の返信内容や成功したツイートを保存し、関連する文脈を検索する。
+KB_BACKEND=faiss を指定すると、ChromaDBの代わりにFAISSのIndexFlatIPを使う。
 """
 
 import os
+import pickle
 from datetime import datetime
 from typing import Dict, List, Optional
-import chromadb
-from chromadb.config import Settings
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from modules.embedding_cache import EmbeddingCache
+
+EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+EMBEDDING_DIM = 384
+BACKENDS = ("chroma", "faiss")
+
+
+class _FaissCollection:
+    """
+    FAISS (IndexFlatIP) によるコレクション
+
+    KnowledgeBaseが使うChromaDBコレクションのメソッド（add/update/count/query）だけを
+    同じ形で提供する。ベクトルはL2正規化して内積＝コサイン類似度で検索し、
+    文書とメタデータは `<name>.docs.pkl` に保存する。
+    """
+
+    def __init__(self, db_path: str, name: str):
+        import faiss
+
+        self._faiss = faiss
+        self._index_path = os.path.join(db_path, f"{name}.faiss")
+        self._docs_path = os.path.join(db_path, f"{name}.docs.pkl")
+        if os.path.exists(self._index_path) and os.path.exists(self._docs_path):
+            self._index = faiss.read_index(self._index_path)
+            with open(self._docs_path, "rb") as f:
+                state = pickle.load(f)
+        else:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(EMBEDDING_DIM))
+            state = {"next_id": 0, "ids": {}, "docs": {}}
+        self._next_id: int = state["next_id"]
+        self._ids: Dict[str, int] = state["ids"]  # 文書ID -> FAISS内部ID
+        self._docs: Dict[int, tuple] = state["docs"]  # FAISS内部ID -> (文書ID, 本文, メタデータ)
+
+    def _vectors(self, embeddings: List[List[float]]) -> np.ndarray:
+        vecs = np.asarray(embeddings, dtype=np.float32).reshape(-1, EMBEDDING_DIM).copy()
+        self._faiss.normalize_L2(vecs)
+        return vecs
+
+    def _save(self) -> None:
+        self._faiss.write_index(self._index, self._index_path)
+        tmp_path = self._docs_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"next_id": self._next_id, "ids": self._ids, "docs": self._docs}, f)
+        os.replace(tmp_path, self._docs_path)
+
+    def add(self, ids, embeddings, documents, metadatas) -> None:
+        """文書を追加する（既存IDがある場合はChromaDBと同様に例外を送出）"""
+        dup = [i for i in ids if i in self._ids]
+        if dup:
+            raise ValueError(f"IDs already exist: {dup}")
+        faiss_ids = np.arange(self._next_id, self._next_id + len(ids), dtype=np.int64)
+        self._next_id += len(ids)
+        self._index.add_with_ids(self._vectors(embeddings), faiss_ids)
+        for fid, doc_id, doc, meta in zip(faiss_ids.tolist(), ids, documents, metadatas):
+            self._ids[doc_id] = fid
+            self._docs[fid] = (doc_id, doc, meta)
+        self._save()
+
+    def update(self, ids, embeddings, documents, metadatas) -> None:
+        """既存の文書を置き換える"""
+        old = np.array([self._ids.pop(i) for i in ids if i in self._ids], dtype=np.int64)
+        if old.size:
+            self._index.remove_ids(old)
+            for fid in old.tolist():
+                del self._docs[fid]
+        self.add(ids, embeddings, documents, metadatas)
+
+    def count(self) -> int:
+        return self._index.ntotal
+
+    def query(self, query_embeddings, n_results: int) -> Dict:
+        """
+        ChromaDBのquery結果と同じ形式で上位n件を返す
+
+        距離はChromaDBの既定（l2空間、二乗ユークリッド距離）に揃える。
+        正規化済みベクトルでは ||a - b||^2 = 2 - 2 * cos なので、内積から換算する。
+        """
+        sims, fids = self._index.search(self._vectors(query_embeddings), n_results)
+        hits = [[(self._docs[f], max(0.0, 2.0 - 2.0 * s)) for f, s in zip(row_f, row_s) if f != -1]
+                for row_f, row_s in zip(fids.tolist(), sims.tolist())]
+        return {
+            "ids": [[d[0] for d, _ in row] for row in hits],
+            "documents": [[d[1] for d, _ in row] for row in hits],
+            "metadatas": [[d[2] for d, _ in row] for row in hits],
+            "distances": [[dist for _, dist in row] for row in hits],
+        }
+
+    def delete_files(self) -> None:
+        """保存ファイルを削除する"""
+        for path in (self._index_path, self._docs_path):
+            if os.path.exists(path):
+                os.remove(path)
+
 
 class KnowledgeBase:
     """
     ベクトルデータベースを使用した知識ベースクラス
 
-    ChromaDBを使用して、過去の返信やツイートを保存・検索する。
+    ChromaDB（またはFAISS）を使用して、過去の返信やツイートを保存・検索する。
     sentence-transformersを使って軽量な埋め込みを生成。
     """
 
-    def __init__(self, db_path: str = "data/chroma_db"):
+    def __init__(self, db_path: str = "data/chroma_db", backend: Optional[str] = None):
         """
         KnowledgeBaseの初期化
 
         Args:
-            db_path: ChromaDBの保存先パス
+            db_path: ChromaDB（またはFAISSインデックス）の保存先パス
+            backend: "chroma" または "faiss"（省略時は環境変数 KB_BACKEND、既定は chroma）
         """
         self.db_path = db_path
-
-        # ChromaDBクライアントの初期化
-        self.client = chromadb.PersistentClient(
-            path=db_path,
-            settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
+        self.backend = (backend or os.getenv("KB_BACKEND", "chroma")).lower()
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown knowledge base backend: {self.backend}")
+
+        if self.backend == "chroma":
+            import chromadb
+            from chromadb.config import Settings
+
+            # ChromaDBクライアントの初期化
+            self.client = chromadb.PersistentClient(
+                path=db_path,
+                settings=Settings(
+                    anonymized_telemetry=False,
+                    allow_reset=True
+                )
             )
-        )
+        else:
+            os.makedirs(db_path, exist_ok=True)
+            self.client = None
 
         # 軽量な埋め込みモデルの初期化
         # all-MiniLM-L6-v2: 384次元、高速、多言語対応
-        self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+        self.embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+
+        # 同じテキストを再度埋め込まないためのディスクキャッシュ
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(db_path, "embedding_cache.db"), model=EMBEDDING_MODEL
+        )
 
         # コレクションの取得または作成
         self._initialize_collections()
 
     def _initialize_collections(self):
         """コレクションの初期化"""
+        if self.backend == "faiss":
+            self.replies_collection = _FaissCollection(self.db_path, "replies")
+            self.tweets_collection = _FaissCollection(self.db_path, "successful_tweets")
+            return
+
         # 返信用コレクション
         try:
             self.replies_collection = self.client.get_collection(name="replies")
@@ -66,6 +182,10 @@ class KnowledgeBase:
                 metadata={"description": "High engagement tweets"}
             )
 
+    def _embed(self, text: str) -> List[float]:
+        """テキストを埋め込む（キャッシュにあれば再計算しない）"""
+        return self.embedding_cache.embed_with_cache(text, self.embedding_model.encode).tolist()
+
     def add_reply(self, reply_id: str, content: str, metadata: Dict):
         """
         返信を知識ベースに追加
@@ -76,7 +196,7 @@ class KnowledgeBase:
             metadata: メタデータ (author, tweet_id, replied_at, sentiment)
         """
         # 埋め込みの生成
-        embedding = self.embedding_model.encode(content).tolist()
+        embedding = self._embed(content)
 
         # メタデータの準備（ChromaDBは文字列のみサポート）
         chroma_metadata = {
@@ -118,7 +238,7 @@ class KnowledgeBase:
             engagement: エンゲージメント情報 (likes, retweets, engagement_rate, posted_at)
         """
         # 埋め込みの生成
-        embedding = self.embedding_model.encode(content).tolist()
+        embedding = self._embed(content)
 
         # メタデータの準備
         chroma_metadata = {
@@ -162,7 +282,7 @@ class KnowledgeBase:
             類似する返信のリスト
         """
         # クエリの埋め込みを生成
-        query_embedding = self.embedding_model.encode(query).tolist()
+        query_embedding = self._embed(query)
 
         # コレクションが空の場合は空リストを返す
         try:
@@ -206,7 +326,7 @@ class KnowledgeBase:
             類似するツイートのリスト
         """
         # クエリの埋め込みを生成
-        query_embedding = self.embedding_model.encode(query).tolist()
+        query_embedding = self._embed(query)
 
         # コレクションが空の場合は空リストを返す
         try:
@@ -305,7 +425,8 @@ class KnowledgeBase:
             "replies_count": replies_count,
             "tweets_count": tweets_count,
             "total_count": replies_count + tweets_count,
-            "db_path": self.db_path
+            "db_path": self.db_path,
+            "backend": self.backend
         }
 
     def reset(self):
@@ -315,8 +436,12 @@ class KnowledgeBase:
         警告: この操作は元に戻せません
         """
         try:
-            self.client.delete_collection(name="replies")
-            self.client.delete_collection(name="successful_tweets")
+            if self.backend == "faiss":
+                self.replies_collection.delete_files()
+                self.tweets_collection.delete_files()
+            else:
+                self.client.delete_collection(name="replies")
+                self.client.delete_collection(name="successful_tweets")
             self._initialize_collections()
             print("Knowledge base has been reset.")
         except Exception as e:
@@ -5,7 +5,7 @@
 
 テスト用のサンプルツイートデータをデータベースに追加します
 """
-from modules.analyzer import EngagementAnalyzer
+from modules.analyzer import SNAPSHOT_COLUMNS, EngagementAnalyzer
 
 
 def generate_sample_data():
@@ -150,8 +150,9 @@ def generate_sample_data():
         },
     ]
 
-    for tweet in sample_tweets:
-        analyzer.add_tweet(**tweet)
+    analyzer.add_tweets(
+        tuple(tweet[column] for column in SNAPSHOT_COLUMNS) for tweet in sample_tweets
+    )
 
     print(f"✓ {len(sample_tweets)}件のサンプルツイートを追加しました")
 
@@ -12,7 +12,7 @@ from datetime import datetime, timezone
 
 import pytest
 
-from modules.analyzer import EngagementAnalyzer
+from modules.analyzer import EngagementAnalyzer, cache_stats
 
 
 @pytest.fixture
@@ -23,15 +23,18 @@ def temp_db():
 
     yield db_path
 
-    # クリーンアップ
-    if os.path.exists(db_path):
-        os.unlink(db_path)
+    # クリーンアップ（WALモードの付随ファイルも含む）
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        if os.path.exists(path):
+            os.unlink(path)
 
 
 @pytest.fixture
 def analyzer(temp_db):
     """テスト用のEngagementAnalyzerインスタンスを作成"""
-    return EngagementAnalyzer(db_path=temp_db)
+    analyzer = EngagementAnalyzer(db_path=temp_db)
+    yield analyzer
+    analyzer.close()
 
 
 @pytest.fixture
@@ -136,6 +139,19 @@ class TestEngagementAnalyzer:
         assert row[3] == 2
         assert row[4] == 1
 
+    def test_add_tweets_batch(self, analyzer):
+        """複数ツイートをまとめて追加・上書きできること"""
+        analyzer.add_tweets([
+            ("a", "一件目", 1, 0, 0, 10, None),
+            ("b", "二件目", 2, 0, 0, 20, "2025-01-01T00:00:00+00:00"),
+        ])
+        analyzer.add_tweets(iter([("a", "一件目（更新）", 5, 1, 0, 10, None)]))
+
+        rows = {r[0]: r for r in analyzer.load_snapshot()}
+        assert len(rows) == 2
+        assert rows["a"][1:4] == ("一件目（更新）", 5, 1)
+        assert rows["b"][6] == "2025-01-01T00:00:00+00:00"
+
     def test_get_top_tweets_by_likes(self, analyzer, sample_tweets):
         """いいね数でトップツイートを取得するテスト"""
         top_tweets = analyzer.get_top_tweets(limit=3, metric="likes")
@@ -226,6 +242,19 @@ class TestEngagementAnalyzer:
             assert ":" in start
             assert ":" in end
 
+    def test_optimal_posting_time_keeps_recorded_offset(self, analyzer):
+        """オフセット付きの時刻は記録された時のまま集計し、同率なら先に現れた時間帯を優先すること"""
+        analyzer.add_tweets([
+            ("1", "a", 0, 0, 0, 100, "2025-01-01T21:30:00+09:00"),
+            ("2", "b", 0, 0, 0, 100, "2025-01-01 07:00:00"),
+            ("3", "c", 0, 0, 0, 100, "2025-01-02"),
+            ("4", "d", 0, 0, 0, 100, "2025-01-02T05:00:00Z"),
+            ("5", "e", 9, 0, 0, 100, "不正な日時"),
+        ])
+        expected = ["21:00-22:00", "07:00-08:00", "00:00-01:00"]
+        assert analyzer.get_optimal_posting_time() == expected
+        assert analyzer.get_optimal_posting_time(rows=analyzer.load_snapshot()) == expected
+
     def test_analyze_topic_performance(self, analyzer, sample_tweets):
         """トピックパフォーマンス分析のテスト"""
         topic_performance = analyzer.analyze_topic_performance()
@@ -238,6 +267,25 @@ class TestEngagementAnalyzer:
             assert "avg_likes" in topic_performance["AI"]
             assert topic_performance["AI"]["count"] > 0
 
+    def test_topics_with_overlapping_keywords(self, analyzer):
+        """キーワード同士が重なっていても両方のトピックが検出されること"""
+        assert analyzer._extract_topics(["ライフハックラウド"]) == ["生産性", "テクノロジー"]
+
+        analyzer.add_tweet(tweet_id="1", content="機械学習慣", likes=10)
+        topics = analyzer.analyze_topic_performance()
+        assert topics["AI"] == {"count": 1, "avg_likes": 10.0}
+        assert topics["生産性"] == {"count": 1, "avg_likes": 10.0}
+
+    def test_topic_keywords_fallback(self, monkeypatch):
+        """pyahocorasick が無い場合も同じキーワードが見つかること"""
+        from modules import analyzer as analyzer_module
+
+        text = "ビジネスタートアップとAIとAIのデータ"
+        expected = sorted(analyzer_module._find_topic_keywords(text))
+        monkeypatch.setattr(analyzer_module, "_TOPIC_AUTOMATON", None)
+        assert sorted(analyzer_module._find_topic_keywords(text)) == expected
+        assert expected == sorted(["ビジネス", "スタートアップ", "AI", "AI", "データ"])
+
     def test_get_stats_summary(self, analyzer, sample_tweets):
         """統計サマリー取得のテスト"""
         summary = analyzer.get_stats_summary()
@@ -261,6 +309,173 @@ class TestEngagementAnalyzer:
         assert summary["avg_likes"] == 0
         assert summary["max_likes"] == 0
 
+    def test_stats_summary_follows_writes(self, temp_db):
+        """集計テーブルが挿入・上書き・更新・削除の後も全件集計と一致すること"""
+        # 集計テーブルが無い既存のDBでは、初期化時に既存行から集計する
+        conn = sqlite3.connect(temp_db)
+        conn.execute(
+            "CREATE TABLE tweets (tweet_id TEXT PRIMARY KEY, content TEXT NOT NULL, likes INTEGER DEFAULT 0,"
+            " retweets INTEGER DEFAULT 0, replies INTEGER DEFAULT 0, impressions INTEGER DEFAULT 0,"
+            " posted_at TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+        )
+        conn.execute("INSERT INTO tweets (tweet_id, content, likes, impressions) VALUES ('0', 'x', 7, 70)")
+        conn.commit()
+        conn.close()
+
+        with EngagementAnalyzer(db_path=temp_db) as analyzer:
+            analyzer.add_tweets([
+                ("1", "a", 10, 2, 1, 100, None),
+                ("2", "b", 30, 4, 3, 300, None),
+            ])
+            analyzer.add_tweet(tweet_id="1", content="a2", likes=50, impressions=500)
+            with analyzer.conn as conn:
+                conn.execute("UPDATE tweets SET retweets = 9 WHERE tweet_id = '2'")
+                conn.execute("DELETE FROM tweets WHERE tweet_id = '0'")
+
+            summary = analyzer.get_stats_summary()
+            assert summary == analyzer.get_stats_summary(rows=analyzer.load_snapshot())
+            assert summary == {
+                "total_tweets": 2,
+                "avg_likes": 40.0,
+                "avg_retweets": 4.5,
+                "avg_replies": 1.5,
+                "max_likes": 50,
+                "total_impressions": 800,
+            }
+
+    def test_stats_summary_averages_skip_nulls(self, analyzer):
+        """平均はAVG()と同じくNULLの行を分母に含めないこと"""
+        analyzer.add_tweets([
+            ("1", "a", 10, 2, 1, 100, None),
+            ("2", "b", None, None, None, None, None),
+        ])
+        expected = {
+            "total_tweets": 2,
+            "avg_likes": 10.0,
+            "avg_retweets": 2.0,
+            "avg_replies": 1.0,
+            "max_likes": 10,
+            "total_impressions": 100,
+        }
+        assert analyzer.get_stats_summary() == expected
+        assert analyzer.get_stats_summary(rows=analyzer.load_snapshot()) == expected
+
+        # NULLから値への更新・削除にも追従する
+        with analyzer.conn as conn:
+            conn.execute("UPDATE tweets SET likes = 30 WHERE tweet_id = '2'")
+        assert analyzer.get_stats_summary()["avg_likes"] == 20.0
+        with analyzer.conn as conn:
+            conn.execute("UPDATE tweets SET likes = NULL WHERE tweet_id = '1'")
+            conn.execute("DELETE FROM tweets WHERE tweet_id = '2'")
+        summary = analyzer.get_stats_summary()
+        assert summary == analyzer.get_stats_summary(rows=analyzer.load_snapshot())
+        assert summary["avg_likes"] == 0
+        assert summary["avg_retweets"] == 2.0
+
+    def test_rebuilds_legacy_agg_table(self, temp_db):
+        """件数列の無い旧形式の集計テーブルは作り直して集計し直すこと"""
+        with EngagementAnalyzer(db_path=temp_db) as analyzer:
+            analyzer.add_tweets([
+                ("1", "a", 10, 2, 1, 100, None),
+                ("2", "b", None, 4, 3, 300, None),
+            ])
+            with analyzer.conn as conn:
+                conn.execute("DROP TABLE tweets_agg")
+                conn.execute(
+                    "CREATE TABLE tweets_agg (id INTEGER PRIMARY KEY CHECK (id = 0),"
+                    " total_tweets INTEGER NOT NULL, sum_likes INTEGER NOT NULL,"
+                    " sum_retweets INTEGER NOT NULL, sum_replies INTEGER NOT NULL,"
+                    " total_impressions INTEGER NOT NULL)"
+                )
+                conn.execute("INSERT INTO tweets_agg VALUES (0, 2, 10, 6, 4, 400)")
+
+        with EngagementAnalyzer(db_path=temp_db) as analyzer:
+            analyzer.add_tweet(tweet_id="3", content="c", likes=20, impressions=200)
+            summary = analyzer.get_stats_summary()
+            assert summary == analyzer.get_stats_summary(rows=analyzer.load_snapshot())
+            assert summary["avg_likes"] == 15.0
+
+    def test_snapshot_matches_queries(self, analyzer, sample_tweets):
+        """スナップショットからの分析がDBクエリと同じ結果になること"""
+        rows = analyzer.load_snapshot()
+        assert len(rows) == len(sample_tweets)
+
+        assert analyzer.get_stats_summary(rows=rows) == analyzer.get_stats_summary()
+        for metric in ("likes", "retweets", "replies", "engagement"):
+            assert analyzer.get_top_tweets(3, metric, rows=rows) == analyzer.get_top_tweets(3, metric)
+        assert analyzer.extract_successful_features(rows=rows) == analyzer.extract_successful_features()
+        assert analyzer.get_optimal_posting_time(rows=rows) == analyzer.get_optimal_posting_time()
+        assert analyzer.analyze_topic_performance(rows=rows) == analyzer.analyze_topic_performance()
+
+    def test_snapshot_empty_database(self, analyzer):
+        """空のスナップショットでも集計できること"""
+        summary = analyzer.get_stats_summary(rows=analyzer.load_snapshot())
+        assert summary == analyzer.get_stats_summary()
+
+    def test_snapshot_with_null_metrics(self, analyzer):
+        """指標がNULLの行があってもスナップショットからSQLと同じく集計できること"""
+        analyzer.add_tweets([
+            ("1", "AIの話", 10, 2, 1, 100, "2024-01-01T09:00:00"),
+            ("2", "ビジネスの話", None, None, None, None, "2024-01-01T10:00:00"),
+            ("3", "健康の話", None, 1, 0, 50, "2024-01-01T11:00:00"),
+        ])
+        rows = analyzer.load_snapshot()
+
+        assert analyzer.get_stats_summary(rows=rows) == analyzer.get_stats_summary()
+        assert analyzer.get_stats_summary(rows=rows) == {
+            "total_tweets": 3,
+            "avg_likes": 10.0,
+            "avg_retweets": 1.5,
+            "avg_replies": 0.5,
+            "max_likes": 10,
+            "total_impressions": 150,
+        }
+        for metric in ("likes", "retweets", "replies", "engagement"):
+            top = analyzer.get_top_tweets(3, metric, rows=rows)
+            assert top == analyzer.get_top_tweets(3, metric)
+            assert top[0]["tweet_id"] == "1"
+        assert analyzer.extract_successful_features(rows=rows) == analyzer.extract_successful_features()
+        assert analyzer.get_optimal_posting_time(rows=rows) == analyzer.get_optimal_posting_time()
+
+    def test_top_tweets_use_indexes(self, analyzer):
+        """トップN取得が索引を使い、全件ソートをしないこと"""
+        queries = {
+            "idx_tweets_likes": "SELECT tweet_id FROM tweets ORDER BY likes DESC LIMIT 3",
+            "idx_tweets_engagement": (
+                "SELECT CAST(likes + retweets + replies AS FLOAT) / impressions AS r "
+                "FROM tweets WHERE impressions > 0 ORDER BY r DESC LIMIT 3"
+            ),
+        }
+        for index_name, query in queries.items():
+            plan = " ".join(row[-1] for row in analyzer.conn.execute("EXPLAIN QUERY PLAN " + query))
+            assert index_name in plan
+            assert "TEMP B-TREE" not in plan
+
+    def test_results_cached_until_db_changes(self, analyzer, sample_tweets):
+        """DBが変わらない間は分析結果を再計算せず、書き込み後は計算し直すこと"""
+        first = analyzer.analyze_topic_performance()
+        hits = cache_stats()["hits"]
+        assert analyzer.analyze_topic_performance() is first
+        assert cache_stats()["hits"] == hits + 1
+
+        rows = analyzer.load_snapshot()
+        assert analyzer.load_snapshot() is rows
+        by_snapshot = analyzer.get_optimal_posting_time(rows=rows)
+        assert analyzer.get_optimal_posting_time(rows=rows) is by_snapshot
+        # スナップショット以外の行リストはキャッシュしない
+        assert analyzer.get_optimal_posting_time(rows=list(rows)) is not by_snapshot
+
+        analyzer.add_tweet(tweet_id="99", content="AIの話", likes=1000)
+        assert analyzer.load_snapshot() is not rows
+        assert analyzer.analyze_topic_performance()["AI"]["count"] == first["AI"]["count"] + 1
+
+    def test_context_manager_closes_connection(self, temp_db):
+        """with文を抜けると接続が閉じられること"""
+        with EngagementAnalyzer(db_path=temp_db) as analyzer:
+            analyzer.add_tweet(tweet_id="1", content="テスト")
+            assert analyzer.get_stats_summary()["total_tweets"] == 1
+        assert analyzer.conn is None
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
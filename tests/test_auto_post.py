@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for auto_post
+
+Usage:
+    pytest tests/test_auto_post.py -v
+"""
+import asyncio
+
+import auto_post
+from modules.dedup import DedupIndex, normalize
+
+
+def _run_candidates(monkeypatch, outcomes, concurrency=2):
+    """outcomes の順に完了する生成（例外なら送出）で _generate_candidates を実行する"""
+    calls = []
+
+    async def fake_generate_text(provider, info, prompt):
+        i = len(calls)
+        calls.append(prompt)
+        await asyncio.sleep(0.01 * (i + 1))
+        outcome = outcomes[i % len(outcomes)]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(auto_post, "generate_text", fake_generate_text)
+    monkeypatch.setattr(auto_post, "GENERATION_CONCURRENCY", concurrency)
+
+    async def run():
+        index = DedupIndex()
+        index.add(normalize("既に投稿したAIの話題についてのテキストです"))
+        index_task = asyncio.create_task(asyncio.sleep(0, result=index))
+        return await auto_post._generate_candidates("openai", {"model": "m"}, "prompt", index_task)
+
+    return asyncio.run(run()), calls
+
+
+def test_failed_generation_does_not_discard_sibling(monkeypatch):
+    """同時に投げた生成の1つが失敗しても、もう1つの新規テキストを採用すること"""
+    novel = "睡眠の質を上げるために寝る前の一時間は画面を見ないようにしている"
+    (chosen, last), calls = _run_candidates(
+        monkeypatch, [RuntimeError("429 Too Many Requests"), novel]
+    )
+    assert chosen == novel
+    assert last == novel
+    assert len(calls) == 2
+
+
+def test_all_generations_failed(monkeypatch):
+    """すべての生成が失敗した場合は最大試行回数で諦め、テキストを返さないこと"""
+    (chosen, last), calls = _run_candidates(monkeypatch, [TimeoutError("timeout")])
+    assert (chosen, last) == ("", "")
+    assert len(calls) == auto_post.MAX_ATTEMPTS
+
+
+def test_generate_and_post_returns_3_without_text(monkeypatch):
+    """1件も生成できなかった場合だけ生成エラー(3)で終了すること"""
+    for key in ("X_API_KEY", "X_API_SECRET", "X_ACCESS_TOKEN", "X_ACCESS_TOKEN_SECRET"):
+        monkeypatch.setenv(key, "dummy")
+    monkeypatch.setattr(auto_post, "choose_provider", lambda: ("openai", {"model": "m"}))
+    monkeypatch.setattr(auto_post, "prepare_index", DedupIndex)
+
+    async def failing_generate_text(provider, info, prompt):
+        raise RuntimeError("safety block")
+
+    monkeypatch.setattr(auto_post, "generate_text", failing_generate_text)
+
+    async def run():
+        writer = auto_post.OutputWriter()
+        try:
+            return await auto_post._generate_and_post(None, writer)
+        finally:
+            await writer.close()
+
+    assert asyncio.run(run()) == 3
+
+
+def test_markdown_preview_reopens_rotated_file(monkeypatch, tmp_path):
+    """MDファイルがローテーション・削除されたら開き直して新しいファイルに追記すること"""
+    md_path = tmp_path / "tweets_preview.md"
+    monkeypatch.setattr(auto_post, "MD_PATH", md_path)
+    monkeypatch.setattr(auto_post, "_md_fd", None)
+    try:
+        auto_post.append_markdown_preview("一件目", None, None, None)
+        md_path.rename(tmp_path / "tweets_preview.md.1")
+        auto_post.append_markdown_preview("二件目", None, None, None)
+        assert "二件目" in md_path.read_text(encoding="utf-8")
+        assert "二件目" not in (tmp_path / "tweets_preview.md.1").read_text(encoding="utf-8")
+
+        md_path.unlink()
+        auto_post.append_markdown_preview("三件目", None, None, None)
+        assert "三件目" in md_path.read_text(encoding="utf-8")
+        # メタ情報の更新で参照するファイルサイズも取れる
+        assert md_path.stat().st_size > 0
+    finally:
+        auto_post._close_md_fd()
@@ -49,6 +49,20 @@ class TestCharacter(unittest.TestCase):
         self.assertEqual(char.speaking_style["emoji_frequency"], "high")
         self.assertEqual(char.constraints["max_tweet_length"], 140)
 
+    def test_character_uses_slots(self):
+        """インスタンス辞書を持たず、未定義の属性は追加できないこと"""
+        char = Character(
+            name="テストAI",
+            personality="テスト用の性格",
+            tone="フレンドリー",
+            interests=["AI"],
+            knowledge_level="中級",
+        )
+
+        self.assertFalse(hasattr(char, "__dict__"))
+        with self.assertRaises(AttributeError):
+            char.nickname = "テスト"
+
     def test_character_validation_empty_name(self):
         """空の名前でエラーが発生することを確認"""
         with self.assertRaises(ValueError):
@@ -260,6 +274,103 @@ character:
 
         self.assertEqual(char.name, "テストAI")
 
+    def test_cached_reuses_parsed_config(self):
+        """同じファイルの解析結果を再利用しても、インスタンス間で設定を共有しないこと"""
+        manager1 = CharacterManager.cached(str(self.temp_yaml))
+        manager2 = CharacterManager.cached(str(self.temp_yaml))
+
+        self.assertIsNot(manager1, manager2)
+        self.assertEqual(manager1.get_character(), manager2.get_character())
+
+        # リストの変更は他のインスタンス・後から作るインスタンスに影響しない
+        interests = list(manager2.get_character().interests)
+        manager1.get_character().interests.append("追加トピック")
+        self.assertEqual(manager2.get_character().interests, interests)
+
+        manager1.update_character({"tone": "くだけた口調"})
+        manager1.get_character().interests.append("さらに追加")
+        self.assertEqual(manager2.get_character().interests, interests)
+
+        manager3 = CharacterManager.cached(str(self.temp_yaml))
+        self.assertEqual(manager3.get_character().interests, interests)
+        self.assertEqual(manager2.get_character().tone, manager3.get_character().tone)
+
+        # 更新は他のインスタンスに影響しない
+        manager1.update_character({"name": "更新後AI"})
+        self.assertEqual(manager2.get_character().name, "テストAI")
+
+    def test_cached_reloads_when_file_changes(self):
+        """ファイルが更新されたら読み込み直すこと"""
+        import os
+
+        manager1 = CharacterManager.cached(str(self.temp_yaml))
+        content = self.temp_yaml.read_text(encoding="utf-8")
+        self.temp_yaml.write_text(content.replace("テストAI", "変更AI"), encoding="utf-8")
+        stat = self.temp_yaml.stat()
+        os.utime(self.temp_yaml, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        manager2 = CharacterManager.cached(str(self.temp_yaml))
+        self.assertEqual(manager1.get_character().name, "テストAI")
+        self.assertEqual(manager2.get_character().name, "変更AI")
+
+    def test_parse_cache_sidecar(self):
+        """解析結果がJSONキャッシュに保存され、次回以降に使われること"""
+        from unittest.mock import patch
+
+        cache_path = Path(str(self.temp_yaml) + ".cache.json")
+        CharacterManager(str(self.temp_yaml))
+        self.assertTrue(cache_path.exists())
+
+        with patch("modules.character_manager.yaml.load") as mock_load:
+            manager = CharacterManager(str(self.temp_yaml))
+            mock_load.assert_not_called()
+        self.assertEqual(manager.get_character().name, "テストAI")
+
+    def test_save_character_rewrites_cache(self):
+        """保存時にキャッシュも書き直され、読み込み時にYAMLを解析しないこと"""
+        from unittest.mock import patch
+
+        manager = CharacterManager(str(self.temp_yaml))
+        manager.update_character({"name": "保存後AI"})
+        manager.save_character()
+
+        with patch("modules.character_manager.yaml.load") as mock_load:
+            reloaded = CharacterManager(str(self.temp_yaml))
+            mock_load.assert_not_called()
+        self.assertEqual(reloaded.get_character().name, "保存後AI")
+
+    def test_prompt_cached_until_character_changes(self):
+        """プロンプトは使い回され、キャラクター更新後は作り直されること"""
+        manager = CharacterManager(str(self.temp_yaml))
+        prompt = manager.get_system_prompt()
+        self.assertIs(manager.get_system_prompt(), prompt)
+
+        manager.update_character({"name": "更新後AI"})
+        self.assertIn("更新後AI", manager.get_system_prompt())
+        self.assertTrue(manager.get_personality_description().startswith("更新後AI:"))
+
+        manager.load_character()
+        self.assertEqual(manager.get_system_prompt(), prompt)
+
+    def test_uses_c_loader_when_available(self):
+        """libyamlが使える場合はC実装のローダーを使うこと"""
+        import yaml
+        from modules import character_manager
+
+        expected = yaml.CSafeLoader if yaml.__with_libyaml__ else yaml.SafeLoader
+        self.assertIs(character_manager._YAMLLoader, expected)
+        expected = yaml.CSafeDumper if yaml.__with_libyaml__ else yaml.SafeDumper
+        self.assertIs(character_manager._YAMLDumper, expected)
+
+    def test_parse_cache_invalidated_on_change(self):
+        """設定ファイルが変更されたらキャッシュを使わないこと"""
+        CharacterManager(str(self.temp_yaml))
+        content = self.temp_yaml.read_text(encoding="utf-8")
+        self.temp_yaml.write_text(content.replace("テストAI", "変更後のAI"), encoding="utf-8")
+
+        manager = CharacterManager(str(self.temp_yaml))
+        self.assertEqual(manager.get_character().name, "変更後のAI")
+
 
 class TestCharacterManagerIntegration(unittest.TestCase):
     """統合テスト"""
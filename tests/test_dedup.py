@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for DedupIndex
+
+Usage:
+    pytest tests/test_dedup.py -v
+"""
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+from hashlib import blake2b
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from modules.dedup import (
+    _PUNCT_TABLE,
+    DedupIndex,
+    char_ngram_codes,
+    char_ngrams,
+    hamming,
+    hamming_many,
+    jaccard,
+    jaccard_at_least,
+    normalize,
+    pack_entry,
+    simhash,
+    text_features,
+    unpack_entries,
+)
+
+
+PAST_TEXTS = [
+    "知ってました？睡眠不足は判断力を大きく低下させます。7時間の睡眠を心がけましょう。",
+    "AIの進化が加速中！量子コンピュータと組み合わせると計算の常識が変わるかもしれません。",
+    "成功する人と失敗する人の違い：小さな習慣を毎日続けられるかどうかです。",
+]
+
+
+@pytest.fixture
+def index():
+    """過去投稿を登録したインデックスを作成"""
+    idx = DedupIndex()
+    for t in PAST_TEXTS:
+        idx.add(normalize(t))
+    return idx
+
+
+def test_normalize():
+    """句読点と空白が正規化されること"""
+    assert normalize("  Hello,   World!  ") == "hello world "
+    assert normalize("") == ""
+
+
+@pytest.mark.parametrize(
+    "text", PAST_TEXTS + ["!!!", "(a)", "a\u3000b\tc\n", " ", "「引用」です", "x..y"]
+)
+def test_normalize_matches_regex(text):
+    """正規表現による空白正規化と同じ結果になること"""
+    expected = re.sub(r"\s+", " ", text.strip().lower().translate(_PUNCT_TABLE))
+    assert normalize(text) == expected
+
+
+def test_char_ngrams():
+    """空白を除いたbigramが生成されること"""
+    assert char_ngrams("ab c", 2) == {"ab", "bc"}
+    assert char_ngrams("a", 2) == {"a"}
+    assert char_ngrams("", 2) == set()
+
+
+@pytest.mark.parametrize("text", PAST_TEXTS + ["", "a", "ab c", "絵文字😀も"])
+def test_char_ngram_codes_match_char_ngrams(text):
+    """整数コードのn-gramが文字列n-gramと一対一に対応すること"""
+    other = normalize(PAST_TEXTS[0])
+    assert len(char_ngram_codes(text, 2)) == len(char_ngrams(text, 2))
+    assert jaccard(char_ngram_codes(text, 2), char_ngram_codes(other, 2)) == jaccard(
+        char_ngrams(text, 2), char_ngrams(other, 2)
+    )
+
+
+def test_jaccard():
+    """Jaccard係数が計算されること"""
+    assert jaccard({"a", "b"}, {"a", "b"}) == 1.0
+    assert jaccard({"a", "b"}, {"b", "c"}) == pytest.approx(1 / 3)
+    assert jaccard(set(), {"a"}) == 0.0
+
+
+def _reference_simhash(tokens):
+    """ビット単位ループによる素朴なSimHash（検証用）"""
+    v = [0] * 64
+    for tok, cnt in Counter(tokens).items():
+        h = int.from_bytes(blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+        for i in range(64):
+            v[i] += cnt if (h >> i) & 1 else -cnt
+    return sum(1 << i for i, val in enumerate(v) if val >= 0)
+
+
+@pytest.mark.parametrize("text", PAST_TEXTS + ["", "a"])
+def test_simhash_matches_reference(text):
+    """SimHashが素朴な実装と一致すること"""
+    tokens = list(char_ngrams(normalize(text), 2)) + ["重み", "重み"]
+    assert simhash(tokens) == _reference_simhash(tokens)
+
+
+@pytest.mark.parametrize("text", PAST_TEXTS + ["", "a"])
+def test_simhash_set_fast_path(text):
+    """集合を渡した場合も素朴な実装と一致すること"""
+    grams = char_ngrams(normalize(text), 2)
+    assert simhash(grams) == _reference_simhash(grams)
+    assert simhash(set(grams)) == simhash(list(grams))
+
+
+def test_jaccard_at_least():
+    """サイズ比で到達不能な場合のみ0.0になること"""
+    a = {"a", "b", "c", "d", "e"}
+    assert jaccard_at_least(a, {"a"}, 0.5) == 0.0
+    assert jaccard_at_least(a, {"a", "b", "c", "d"}, 0.5) == jaccard(a, {"a", "b", "c", "d"})
+    assert jaccard_at_least(a, {"a"}, 0.0) == jaccard(a, {"a"})
+
+
+def test_simhash_stable_across_processes():
+    """SimHashがPYTHONHASHSEEDに依存しないこと"""
+    code = (
+        "from modules.dedup import simhash, char_ngrams;"
+        f"print(simhash(char_ngrams({PAST_TEXTS[0]!r}, 2)))"
+    )
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            cwd=Path(__file__).resolve().parent.parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        for seed in ("1", "2")
+    }
+    assert outputs == {str(simhash(char_ngrams(PAST_TEXTS[0], 2)))}
+
+
+def test_refresh_simhashes(index):
+    """保存済みのSimHashが再計算されること"""
+    expected = [item["simhash"] for item in index]
+    for item in index:
+        item["simhash"] = 0
+    index.refresh_simhashes()
+    assert [item["simhash"] for item in index] == expected
+    assert index.most_similar(PAST_TEXTS[0])[1] == 0
+
+
+def test_simhash_identical_tokens():
+    """同じトークン集合のSimHashは一致すること"""
+    grams = char_ngrams(normalize(PAST_TEXTS[0]), 2)
+    assert hamming(simhash(grams), simhash(set(grams))) == 0
+
+
+def test_hamming_many_matches_scalar():
+    """一括計算のハミング距離がスカラー版と一致すること"""
+    values = [0, 1, (1 << 64) - 1, 0x0F0F0F0F0F0F0F0F, 12345678901234567890]
+    arr = np.array(values, dtype=np.uint64)
+    sh = 0x00FF00FF00FF00FF
+    assert hamming_many(arr, sh).tolist() == [hamming(v, sh) for v in values]
+
+
+def test_most_similar_exact_duplicate(index):
+    """完全一致の投稿が最も類似すると判定されること"""
+    jac, ham, nearest = index.most_similar(PAST_TEXTS[1])
+    assert jac == 1.0
+    assert ham == 0
+    assert nearest["norm"] == normalize(PAST_TEXTS[1])
+
+
+def test_most_similar_near_duplicate(index):
+    """軽微な変更の投稿も候補として検出されること"""
+    jac, _, nearest = index.most_similar(PAST_TEXTS[0].replace("7時間", "8時間"))
+    assert jac >= 0.8
+    assert nearest["norm"] == normalize(PAST_TEXTS[0])
+
+
+def test_most_similar_novel_text(index):
+    """新規性の高い投稿は重複と判定されないこと"""
+    jac, _, _ = index.most_similar("今日から始められること：机の上を5分だけ片付けてみましょう。")
+    assert jac < 0.8
+
+
+def test_most_similar_empty_index():
+    """空のインデックスでは類似なしとなること"""
+    assert DedupIndex().most_similar("テスト") == (0.0, 64, None)
+
+
+def test_restore_from_persisted_items(index):
+    """永続化済みエントリからLSHを再構築できること"""
+    restored = DedupIndex(index.items)
+    assert len(restored) == len(index)
+    jac, _, _ = restored.most_similar(PAST_TEXTS[2])
+    assert jac == 1.0
+
+
+def test_restore_legacy_items_without_minhash():
+    """minhashを持たない旧形式のエントリも読み込めること"""
+    norm = normalize(PAST_TEXTS[0])
+    restored = DedupIndex([{"norm": norm, "simhash": simhash(char_ngrams(norm, 2))}])
+    assert "minhash" in restored.items[0]
+    jac, _, _ = restored.most_similar(PAST_TEXTS[0])
+    assert jac == 1.0
+
+
+def test_pack_unpack_roundtrip(index):
+    """バイナリレコードから同じエントリが復元できること"""
+    data = b"".join(pack_entry(item) for item in index)
+    assert list(unpack_entries(data)) == index.items
+
+
+def test_unpack_truncated_record(index):
+    """途中で切れたレコードはエラーになること"""
+    data = b"".join(pack_entry(item) for item in index)
+    with pytest.raises(ValueError):
+        list(unpack_entries(data[:-1]))
+
+
+def test_text_features_cached():
+    """同じテキストの特徴量は再計算されないこと"""
+    norm = normalize(PAST_TEXTS[1])
+    first = text_features(norm)
+    assert text_features(norm) is first
+    grams = char_ngrams(norm, 2)
+    assert first[1] == simhash(grams)
+    assert first[0] == char_ngram_codes(norm, 2)
+
+
+def test_hamming_many_lookup_fallback(monkeypatch):
+    """np.bitwise_count が無い環境でも同じ結果になること"""
+    values = np.array([0, (1 << 64) - 1, 0x0F0F0F0F0F0F0F0F], dtype=np.uint64)
+    expected = hamming_many(values, 0x00FF00FF00FF00FF).tolist()
+    monkeypatch.setattr("modules.dedup._HAS_BITWISE_COUNT", False)
+    assert hamming_many(values, 0x00FF00FF00FF00FF).tolist() == expected
+
+
+def test_grams_computed_lazily(index):
+    """bigram集合は比較対象になったエントリだけ計算されること"""
+    restored = DedupIndex(index.items)
+    assert all(g is None for g in restored._grams)
+    restored.most_similar(PAST_TEXTS[0])
+    assert restored._grams[0] == char_ngram_codes(normalize(PAST_TEXTS[0]), 2)
+    assert restored._grams[1] is None
+
+
+def test_simhash_array_extended_on_add(index):
+    """構築済みのSimHash配列に追加エントリが反映されること"""
+    index.most_similar(PAST_TEXTS[0])
+    item = index.add(normalize("新しい投稿：朝の散歩で集中力が上がる理由"))
+    assert index._simhash_array().tolist() == [i["simhash"] for i in index]
+    assert index.most_similar("新しい投稿：朝の散歩で集中力が上がる理由")[2] is item
+
+
+def test_simhash_array_grows_geometrically(index):
+    """追加のたびに配列全体を作り直さず、容量を倍々で確保すること"""
+    index.most_similar(PAST_TEXTS[0])
+    reallocations = 0
+    buf = index._sh_buf
+    for i in range(100):
+        index.add(normalize(f"追加投稿その{i}：毎日少しずつ続けることが大切です"))
+        if index._sh_buf is not buf:
+            reallocations += 1
+            buf = index._sh_buf
+    assert reallocations <= 7
+    assert len(index._sh_buf) >= len(index)
+    assert index._simhash_array().tolist() == [i["simhash"] for i in index]
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""EmbeddingCache のユニットテスト"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.embedding_cache import EmbeddingCache
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """EmbeddingCacheクラスのテストケース"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "embedding_cache.db")
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _embed(self, text):
+        self.calls.append(text)
+        return [float(len(text)), 0.5, -1.0]
+
+    def test_hit_skips_embedding(self):
+        """2回目以降は埋め込み関数を呼ばないこと"""
+        cache = EmbeddingCache(self.db_path, model="m1")
+        first = cache.embed_with_cache("AI開発", self._embed)
+        second = cache.embed_with_cache("AI開発", self._embed)
+        self.assertEqual(self.calls, ["AI開発"])
+        self.assertEqual(second.dtype, np.float32)
+        np.testing.assert_array_equal(first, second)
+        cache.close()
+
+    def test_persisted_across_instances(self):
+        """別インスタンスからもキャッシュが読めること"""
+        cache = EmbeddingCache(self.db_path, model="m1")
+        cache.embed_with_cache("テスト", self._embed)
+        cache.close()
+
+        reopened = EmbeddingCache(self.db_path, model="m1")
+        vec = reopened.get("テスト")
+        self.assertIsNotNone(vec)
+        np.testing.assert_array_equal(vec, np.array([3.0, 0.5, -1.0], dtype=np.float32))
+        self.assertEqual(len(reopened), 1)
+        reopened.close()
+
+    def test_model_change_invalidates(self):
+        """モデルや提供元が変わると既存のベクトルを返さないこと"""
+        cache = EmbeddingCache(self.db_path, model="m1")
+        cache.put("テスト", [1.0, 2.0])
+        cache.close()
+
+        other_model = EmbeddingCache(self.db_path, model="m2")
+        self.assertIsNone(other_model.get("テスト"))
+        other_model.close()
+
+        other_provider = EmbeddingCache(self.db_path, model="m1", provider="openai")
+        self.assertIsNone(other_provider.get("テスト"))
+        other_provider.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
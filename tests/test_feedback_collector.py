@@ -5,6 +5,7 @@ FeedbackCollectorのユニットテスト
 モックAPIを使用してFeedbackCollectorの機能をテストする
 """
 
+import asyncio
 import os
 import sqlite3
 import tempfile
@@ -16,7 +17,7 @@ from unittest.mock import MagicMock, Mock, patch
 import tweepy
 
 from modules.db_manager import DBManager
-from modules.feedback_collector import FeedbackCollector
+from modules.feedback_collector import AsyncFeedbackCollector, FeedbackCollector
 
 
 class TestDBManager(unittest.TestCase):
@@ -31,9 +32,11 @@ class TestDBManager(unittest.TestCase):
 
     def tearDown(self):
         """テスト後のクリーンアップ"""
-        # 一時ファイルを削除
-        if Path(self.db_path).exists():
-            Path(self.db_path).unlink()
+        # 一時ファイルを削除（WALモードの付随ファイルも含む）
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(self.db_path + suffix)
+            if path.exists():
+                path.unlink()
         Path(self.temp_dir).rmdir()
 
     def test_db_initialization(self):
@@ -130,6 +133,87 @@ class TestDBManager(unittest.TestCase):
         self.assertEqual(len(history), 1)
         self.assertEqual(history[0]['likes'], 10)
         self.assertEqual(history[0]['retweets'], 5)
+        # 行は辞書に変換せずに返す
+        self.assertIsInstance(history[0], sqlite3.Row)
+        self.assertEqual(dict(history[0])['impressions'], 100)
+
+    def test_insert_many(self):
+        """複数件をまとめて挿入・更新するテスト"""
+        self.db.insert_tweets_many([
+            {'tweet_id': f'tweet_{i}', 'content': f'Tweet {i}', 'likes': i}
+            for i in range(3)
+        ])
+        # 既存のツイートは更新される
+        self.db.insert_tweets_many([{'tweet_id': 'tweet_0', 'content': 'Updated', 'likes': 7}])
+        self.db.insert_replies_many([
+            {
+                'reply_id': f'reply_{i}',
+                'tweet_id': 'tweet_0',
+                'author_id': '111',
+                'author_username': 'testuser',
+                'content': f'Reply {i}',
+            }
+            for i in range(2)
+        ])
+        self.db.insert_engagement_snapshots_many([
+            {'tweet_id': 'tweet_1', 'likes': 1},
+            {'tweet_id': 'tweet_1', 'likes': 2},
+        ])
+
+        stats = self.db.get_statistics()
+        self.assertEqual(stats['total_tweets'], 3)
+        self.assertEqual(stats['total_snapshots'], 2)
+        self.assertEqual(len(self.db.get_replies('tweet_0')), 2)
+        self.assertEqual(self.db.get_tweet('tweet_0')['content'], 'Updated')
+        self.assertEqual(sorted(h['likes'] for h in self.db.get_engagement_history('tweet_1')), [1, 2])
+
+    def test_shared_connection(self):
+        """接続を使い回し、スレッドからの書き込みや失敗したトランザクションも扱えること"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        with self.db._get_connection() as conn1:
+            pass
+        with self.db._get_connection() as conn2:
+            self.assertIs(conn1, conn2)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(
+                lambda i: self.db.insert_tweet({'tweet_id': f't{i}', 'content': 'x'}),
+                range(20),
+            ))
+        self.assertEqual(self.db.get_statistics()['total_tweets'], 20)
+
+        # 失敗したトランザクションはロールバックされる
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db.insert_tweets_many([
+                {'tweet_id': 't99', 'content': 'x'},
+                {'tweet_id': 't100', 'content': None},
+            ])
+        self.assertIsNone(self.db.get_tweet('t99'))
+
+        self.db.close()
+        with self.assertRaises(RuntimeError):
+            self.db.get_tweet('t0')
+
+    def test_get_tweets_without_recent_snapshot(self):
+        """最近のスナップショットが無いツイートだけを返すこと"""
+        for tweet_id in ('never', 'stale', 'fresh'):
+            self.db.insert_tweet({'tweet_id': tweet_id, 'content': tweet_id})
+        with self.db._get_connection() as conn:
+            conn.execute(
+                "INSERT INTO engagement_snapshots (tweet_id, snapshot_at) "
+                "VALUES ('stale', datetime('now', '-30 hours'))"
+            )
+            conn.execute(
+                "INSERT INTO engagement_snapshots (tweet_id, snapshot_at) "
+                "VALUES ('stale', datetime('now', '-25 hours'))"
+            )
+        self.db.insert_engagement_snapshot('fresh', {'likes': 1})
+
+        tweets = self.db.get_tweets_without_recent_snapshot(hours=24)
+        self.assertEqual(sorted(t['tweet_id'] for t in tweets), ['never', 'stale'])
+        tweets = self.db.get_tweets_without_recent_snapshot(hours=26)
+        self.assertEqual(sorted(t['tweet_id'] for t in tweets), ['never'])
 
     def test_get_statistics(self):
         """統計情報の取得テスト"""
@@ -171,9 +255,11 @@ class TestFeedbackCollector(unittest.TestCase):
         """テスト後のクリーンアップ"""
         self.env_patcher.stop()
 
-        # 一時ファイルを削除
-        if Path(self.db_path).exists():
-            Path(self.db_path).unlink()
+        # 一時ファイルを削除（WALモードの付随ファイルも含む）
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(self.db_path + suffix)
+            if path.exists():
+                path.unlink()
         Path(self.temp_dir).rmdir()
 
     @patch('modules.feedback_collector.tweepy.Client')
@@ -299,6 +385,31 @@ class TestFeedbackCollector(unittest.TestCase):
         self.assertEqual(len(history), 1)
         self.assertEqual(history[0]['likes'], 15)
 
+    @patch('modules.feedback_collector.tweepy.Client')
+    def test_collect_tweet_engagement_batch(self, mock_client_class):
+        """複数ツイートのエンゲージメントを1リクエストで収集するテスト"""
+        mock_client = MagicMock()
+        mock_client.get_tweets.return_value = Mock(data=[
+            Mock(
+                id=tid,
+                text=f'Tweet {tid}',
+                created_at=datetime.now(timezone.utc),
+                public_metrics={'like_count': i, 'retweet_count': 0, 'reply_count': 0, 'impression_count': 0},
+            )
+            for i, tid in enumerate(['111', '222'])
+        ])
+        mock_client_class.return_value = mock_client
+
+        collector = FeedbackCollector(self.db_path)
+        results = collector.collect_tweet_engagement_batch(['111', '222', '333'])
+
+        # 1回のリクエストでまとめて取得している
+        mock_client.get_tweets.assert_called_once()
+        self.assertEqual(mock_client.get_tweets.call_args.kwargs['ids'], ['111', '222', '333'])
+        self.assertEqual([r['tweet_id'] for r in results], ['111', '222'])
+        self.assertEqual(collector.get_engagement_history('222')[0]['likes'], 1)
+        self.assertEqual(collector.get_engagement_history('333'), [])
+
     @patch('modules.feedback_collector.tweepy.Client')
     @patch('modules.feedback_collector.time.sleep')
     def test_rate_limit_handling(self, mock_sleep, mock_client_class):
@@ -343,6 +454,67 @@ class TestFeedbackCollector(unittest.TestCase):
             self.assertEqual(mock_sleep.call_count, 1)
 
 
+class TestAsyncFeedbackCollector(unittest.IsolatedAsyncioTestCase):
+    """AsyncFeedbackCollectorクラスのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "test_tweets.db")
+
+        self.env_patcher = patch.dict(os.environ, {
+            'X_BEARER_TOKEN': 'test_bearer_token',
+            'X_USER_ID': '12345',
+        })
+        self.env_patcher.start()
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.env_patcher.stop()
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(self.db_path + suffix)
+            if path.exists():
+                path.unlink()
+        Path(self.temp_dir).rmdir()
+
+    @patch('tweepy.asynchronous.AsyncClient')
+    @patch('modules.feedback_collector.tweepy.Client')
+    async def test_collect_concurrently(self, mock_client_class, mock_async_client_class):
+        """複数ツイートのエンゲージメントと返信を並行して収集できるかテスト"""
+        mock_async_client = MagicMock()
+
+        async def get_tweet(id, **kwargs):
+            return Mock(data=Mock(
+                id=id,
+                text=f'Tweet {id}',
+                created_at=datetime.now(timezone.utc),
+                public_metrics={'like_count': 3, 'retweet_count': 1, 'reply_count': 1, 'impression_count': 10}
+            ))
+
+        async def search_recent_tweets(query, **kwargs):
+            tweet_id = query.split()[0].split(':')[1]
+            reply = Mock(id=f'r{tweet_id}', author_id=1, text='reply', created_at=None)
+            return Mock(data=[reply], includes={'users': [Mock(id=1, username='alice')]})
+
+        mock_async_client.get_tweet = get_tweet
+        mock_async_client.search_recent_tweets = search_recent_tweets
+        mock_async_client_class.return_value = mock_async_client
+
+        collector = FeedbackCollector(self.db_path)
+        async_collector = AsyncFeedbackCollector(collector)
+        mock_async_client_class.assert_called_once_with(bearer_token='test_bearer_token')
+
+        results = await asyncio.gather(*(
+            async_collector.collect_tweet_engagement(tid) for tid in ('1', '2')
+        ))
+        replies = await async_collector.collect_replies('1', max_results=5)
+
+        self.assertEqual([r['tweet_id'] for r in results], ['1', '2'])
+        self.assertEqual(len(collector.get_engagement_history('2')), 1)
+        self.assertEqual(replies[0]['author_username'], 'alice')
+        self.assertEqual(len(collector.db.get_replies('1')), 1)
+
+
 def run_tests():
     """テストを実行する"""
     unittest.main(verbosity=2)
@@ -259,6 +259,63 @@ class TestKnowledgeBaseIntegration(unittest.TestCase):
         self.assertGreater(len(context), 0)
 
 
+try:
+    import faiss  # noqa: F401
+    HAS_FAISS = True
+except ImportError:
+    HAS_FAISS = False
+
+
+@unittest.skipUnless(HAS_FAISS, "faiss is not installed")
+class TestKnowledgeBaseFaiss(unittest.TestCase):
+    """FAISSバックエンドのテスト"""
+
+    def setUp(self):
+        """テスト準備"""
+        self.test_db_path = tempfile.mkdtemp()
+        self.kb = KnowledgeBase(db_path=self.test_db_path, backend="faiss")
+
+    def tearDown(self):
+        """クリーンアップ"""
+        if os.path.exists(self.test_db_path):
+            shutil.rmtree(self.test_db_path)
+
+    def test_add_update_and_search(self):
+        """追加・更新・検索・永続化ができること"""
+        self.kb.add_reply("r1", "機械学習のモデル選定", {"sentiment": "positive"})
+        self.kb.add_reply("r2", "データ前処理の方法", {"sentiment": "neutral"})
+        self.kb.add_reply("r1", "機械学習のモデル評価", {"sentiment": "neutral"})
+
+        stats = self.kb.get_stats()
+        self.assertEqual(stats["replies_count"], 2)
+        self.assertEqual(stats["backend"], "faiss")
+
+        reopened = KnowledgeBase(db_path=self.test_db_path, backend="faiss")
+        results = reopened.search_similar_replies("機械学習のモデル評価", top_k=1)
+        self.assertEqual(results[0]["content"], "機械学習のモデル評価")
+        self.assertEqual(results[0]["metadata"]["sentiment"], "neutral")
+        self.assertAlmostEqual(results[0]["distance"], 0.0, places=5)
+
+    def test_distance_matches_chroma_l2(self):
+        """距離がChromaDBの既定（二乗L2距離）と同じ尺度になること"""
+        import numpy as np
+
+        self.kb.add_reply("r1", "機械学習のモデル選定", {})
+        results = self.kb.search_similar_replies("今日の天気は晴れです", top_k=1)
+
+        doc = np.asarray(self.kb._embed("機械学習のモデル選定"), dtype=np.float32)
+        query = np.asarray(self.kb._embed("今日の天気は晴れです"), dtype=np.float32)
+        doc /= np.linalg.norm(doc)
+        query /= np.linalg.norm(query)
+        self.assertAlmostEqual(results[0]["distance"], float(np.sum((doc - query) ** 2)), places=4)
+
+    def test_reset(self):
+        """リセットでデータが削除されること"""
+        self.kb.add_successful_tweet("t1", "今日のAI開発", {"likes": 100})
+        self.kb.reset()
+        self.assertEqual(self.kb.get_stats()["tweets_count"], 0)
+
+
 def run_tests():
     """テストを実行"""
     # テストスイートを作成
@@ -268,6 +325,7 @@ def run_tests():
     # テストケースを追加
     suite.addTests(loader.loadTestsFromTestCase(TestKnowledgeBase))
     suite.addTests(loader.loadTestsFromTestCase(TestKnowledgeBaseIntegration))
+    suite.addTests(loader.loadTestsFromTestCase(TestKnowledgeBaseFaiss))
 
     # テストを実行
     runner = unittest.TextTestRunner(verbosity=2)